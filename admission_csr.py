@@ -0,0 +1,189 @@
+# admission_csr.py
+import numpy as np
+
+GRAPH_KINDS = ("regular", "bea", "unified")
+
+
+class AdmissionCSR:
+    """
+    Integer-array counterpart of the networkx admission graphs.
+
+    Nodes are (program, student) index pairs in node_program / node_student,
+    sorted by program and, within a program, by its preference order
+    (student_scores descending, ties in dataset order), so a program's
+    applicants are the contiguous slice program_ptr[p]:program_ptr[p + 1]
+    and a node's rank is its offset in that slice. Edges are stored in CSR
+    form (indptr, indices). They are the student-preference edges of the
+    networkx builders plus, per program, a cycle through each tie group and
+    one edge from each tie group to the next better one, i.e. exactly the
+    edges of the compact networkx graphs, with a linear edge count.
+
+    kind follows fq_stable_matching.GRAPH_BUILDERS: "regular" has one
+    program per college (regular_quota seats), "bea" one per college with
+    reserved seats for the BEA-eligible students (reserved_quota seats) and
+    "unified" both, named "<college>_reg" / "<college>_res".
+    """
+
+    def __init__(self, data, kind="unified"):
+        if kind not in GRAPH_KINDS:
+            raise ValueError(f"kind must be one of {GRAPH_KINDS}, got {kind!r}")
+        self.kind = kind
+        self.students = list(data["students"])
+        colleges = list(data["colleges"])
+        college_index = {c: j for j, c in enumerate(colleges)}
+        student_index = {s: i for i, s in enumerate(self.students)}
+        num_students, num_colleges = len(self.students), len(colleges)
+        capacities = [data["capacities"][c] for c in colleges]
+        regular_quota = np.array([cap["regular_quota"] for cap in capacities], dtype=np.int64)
+        reserved_quota = np.array([cap["reserved_quota"] for cap in capacities], dtype=np.int64)
+        eligibility = np.array([cap["eligibility_score"] for cap in capacities])
+        bea = np.zeros(num_students, dtype=bool)
+        bea[[student_index[s] for s in data["bea_eligible"]]] = True
+        reserved = np.flatnonzero(reserved_quota > 0)
+
+        # Programs and their colleges.
+        if kind == "regular":
+            self.programs = colleges
+            program_college = np.arange(num_colleges)
+            self.capacities = regular_quota
+        elif kind == "bea":
+            self.programs = [colleges[j] for j in reserved]
+            program_college = reserved
+            self.capacities = reserved_quota[reserved]
+        else:
+            # Each college's regular program, directly followed by its reserved one if it has reserved seats.
+            has_reserved = reserved_quota > 0
+            program_college = np.repeat(np.arange(num_colleges), 1 + has_reserved)
+            is_reserved = np.zeros(len(program_college), dtype=bool)
+            is_reserved[1:] = program_college[1:] == program_college[:-1]
+            self.programs = [f"{colleges[j]}_{'res' if r else 'reg'}" for j, r in zip(program_college, is_reserved)]
+            self.capacities = np.where(is_reserved, reserved_quota[program_college], regular_quota[program_college])
+            regular_program = np.flatnonzero(~is_reserved)
+            reserved_program = np.full(num_colleges, -1, dtype=np.int64)
+            reserved_program[reserved] = regular_program[reserved] + 1
+        self.program_college = program_college
+        program_of = {"regular": np.arange(num_colleges), "bea": np.full(num_colleges, -1, dtype=np.int64)}
+        program_of["bea"][reserved] = np.arange(len(reserved))
+
+        # Student preference lists as one flat array of (student, college, score) entries in list order;
+        # scores are only read for listed pairs, so nothing here is students x colleges.
+        lengths = np.array([len(data["student_preferences"][s]) for s in self.students], dtype=np.int64)
+        entry_student = np.repeat(np.arange(num_students), lengths)
+        entry_college = np.fromiter((college_index[c] for s in self.students for c in data["student_preferences"][s]),
+                                    dtype=np.int64, count=int(lengths.sum()))
+        entry_score = np.fromiter((data["student_scores"][s].get(c, 0) for s in self.students
+                                   for c in data["student_preferences"][s]), dtype=np.float64, count=len(entry_college))
+
+        # Each student's program list: the programs of its colleges, the reserved one right after the regular one.
+        if kind == "unified":
+            res = reserved_program[entry_college]
+            with_res = (res >= 0) & bea[entry_student]
+            entry_of = np.concatenate((np.arange(len(entry_college)), np.flatnonzero(with_res)))
+            program = np.concatenate((regular_program[entry_college], res[with_res]))
+            order = np.argsort(2 * entry_of + (np.arange(len(entry_of)) >= len(entry_college)), kind="stable")
+            entry_of, program = entry_of[order], program[order]
+        else:
+            program = program_of[kind][entry_college]
+            keep = program >= 0
+            if kind == "bea":
+                keep &= bea[entry_student]
+            entry_of, program = np.flatnonzero(keep), program[keep]
+        student_of, score = entry_student[entry_of], entry_score[entry_of]
+        eligible = score >= eligibility[program_college[program]]
+
+        # Nodes: the eligible entries, program-major in preference order.
+        node_entries = np.flatnonzero(eligible)
+        node_score = score[node_entries]
+        order = np.lexsort((student_of[node_entries], -node_score, program[node_entries]))
+        node_entries, node_score = node_entries[order], node_score[order]
+        self.node_program = program[node_entries]
+        self.node_student = student_of[node_entries]
+        self.node_entry = node_entries  # Position in the flat student lists: orders a student's nodes.
+        self.program_ptr = np.searchsorted(self.node_program, np.arange(len(self.programs) + 1))
+        node_of_entry = np.full(len(program), -1, dtype=np.int64)
+        node_of_entry[node_entries] = np.arange(len(node_entries))
+
+        # Student-preference edges: each program to the one listed just above it, when both are nodes.
+        consecutive = (student_of[1:] == student_of[:-1]) & eligible[1:] & eligible[:-1]
+        sources = [node_of_entry[1:][consecutive]]
+        targets = [node_of_entry[:-1][consecutive]]
+        # Program edges: a cycle through each tie group, and each group's head to the previous group's head.
+        nodes = np.arange(len(node_entries))
+        new_group = np.ones(len(nodes), dtype=bool)
+        new_group[1:] = (self.node_program[1:] != self.node_program[:-1]) | (node_score[1:] != node_score[:-1])
+        head = np.maximum.accumulate(np.where(new_group, nodes, 0))
+        group_end = np.append(np.flatnonzero(new_group)[1:], len(nodes))
+        tail = group_end[np.cumsum(new_group) - 1] - 1
+        in_cycle = head != tail
+        sources.append(nodes[in_cycle])
+        targets.append(np.where(nodes == tail, head, nodes + 1)[in_cycle])
+        heads = np.flatnonzero(new_group)
+        chained = heads[1:][self.node_program[heads[1:]] == self.node_program[heads[:-1]]]
+        previous_head = heads[np.searchsorted(heads, chained) - 1]
+        sources.append(chained)
+        targets.append(previous_head)
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        order = np.argsort(sources, kind="stable")
+        self.indices = targets[order]
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(nodes)))))
+
+    @property
+    def num_nodes(self):
+        return len(self.node_program)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.node_program, self.node_student, self.node_entry, self.program_ptr, self.indptr,
+                                      self.indices, self.capacities, self.program_college))
+
+    def to_networkx(self):
+        # The same graph keyed by (program name, student name) tuples, e.g. for rendering.
+        import networkx as nx
+        names = [(self.programs[p], self.students[s]) for p, s in zip(self.node_program.tolist(),
+                                                                      self.node_student.tolist())]
+        G = nx.DiGraph()
+        G.add_nodes_from(names)
+        sources = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        G.add_edges_from((names[u], names[v]) for u, v in zip(sources.tolist(), self.indices.tolist()))
+        return G
+
+    def stable_matching(self):
+        """
+        Student-proposing deferred acceptance over the programs, run in
+        synchronous rounds on the node arrays: every free student proposes
+        to the next program on its list it is eligible for, and each
+        program keeps its best applicants up to its quota. Because node ids
+        are program-major in preference order, "best" is just the smallest
+        node id. Returns the assigned node per student (-1 = unassigned);
+        see solution() for names.
+        """
+        num_students = len(self.students)
+        # The same nodes student-major: each student's programs in its own preference order.
+        by_student = np.argsort(self.node_entry)
+        student_ptr = np.searchsorted(self.node_student[by_student], np.arange(num_students + 1))
+        next_choice = student_ptr[:-1].copy()
+        held = np.empty(0, dtype=np.int64)
+        free = np.flatnonzero(next_choice < student_ptr[1:])
+        while len(free):
+            proposals = by_student[next_choice[free]]
+            candidates = np.sort(np.concatenate((held, proposals)))
+            program = self.node_program[candidates]
+            offset = np.arange(len(candidates)) - np.searchsorted(program, program)
+            accepted = offset < self.capacities[program]
+            held = candidates[accepted]
+            rejected = self.node_student[candidates[~accepted]]
+            next_choice[rejected] += 1
+            free = rejected[next_choice[rejected] < student_ptr[1:][rejected]]
+        assignment = np.full(num_students, -1, dtype=np.int64)
+        assignment[self.node_student[held]] = held
+        return assignment
+
+    def solution(self, assignment=None):
+        # {student: program name} for a node assignment (by default the stable matching).
+        if assignment is None:
+            assignment = self.stable_matching()
+        return {self.students[s]: self.programs[self.node_program[n]]
+                for s, n in enumerate(assignment.tolist()) if n >= 0}
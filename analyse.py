@@ -1,16 +1,76 @@
 # analyze_results.py
 import json
 
+import numpy as np
+
+from binary_dataset import is_binary_dataset, load_compiled
+from binary_results import is_binary_result, load_result
+from compiled_dataset import ensure_compiled
+
 def load_dataset(input_file="college_student_dataset.json"):
+    # A binary dataset directory (see binary_dataset.py) loads as a memory-mapped CompiledDataset.
+    if is_binary_dataset(input_file):
+        return load_compiled(input_file)
     with open(input_file, "r") as f:
         dataset = json.load(f)
     return dataset
 
 def load_solution(input_file):
+    # A binary result directory (see binary_results.py) loads as its memory-mapped college-index column,
+    # which every scoring and stability function accepts in place of the {student: college} dict.
+    if is_binary_result(input_file):
+        return load_result(input_file)
     with open(input_file, "r") as f:
         solution = json.load(f)
     return solution
 
+def _as_assignments(solutions, compiled):
+    # One solution or many, as {student: college} dicts or college-index arrays -> (k, n) int array.
+    if isinstance(solutions, dict):
+        solutions = [solutions]
+    if isinstance(solutions, np.ndarray):
+        return np.atleast_2d(solutions)
+    return np.array([compiled.encode_solution(s) if isinstance(s, dict) else s for s in solutions],
+                    dtype=np.int32).reshape(len(solutions), compiled.num_students)
+
+def score_assignments(solutions, dataset, bins=32, chunk_entries=1 << 22):
+    """
+    Score one or many solutions in a single vectorized pass.
+
+    `solutions` is a {student: college} dict, a list of them, or an int
+    array of college indices (-1 = unassigned) of shape (n,) or (k, n),
+    e.g. a stack of tuning-sweep results. Returns a dict of arrays with one
+    entry per solution:
+      - raw, normalized: satisfaction_score() / normalized_satisfaction_score(),
+      - student_histogram, college_histogram: shape (k, bins); column r
+        counts the assignments at rank r on that side, the last column
+        every rank >= bins - 1 (including off-list pairs).
+    Solutions are processed in chunks of about chunk_entries assignments.
+    """
+    compiled = ensure_compiled(dataset)
+    assignments = _as_assignments(solutions, compiled)
+    k, n = assignments.shape
+    raw = np.zeros(k)
+    student_histogram = np.zeros((k, bins), dtype=np.int64)
+    college_histogram = np.zeros((k, bins), dtype=np.int64)
+    step = max(1, chunk_entries // max(n, 1))
+    for first in range(0, k, step):
+        block = assignments[first:first + step]
+        rows, students = np.nonzero(block >= 0)
+        colleges = block[rows, students]
+        # Off-list pairs carry the rank tables' sentinel rank: they score below every listed choice.
+        for rank, histogram in ((compiled.student_rank[students, colleges], student_histogram),
+                                (compiled.college_rank[colleges, students], college_histogram)):
+            raw[first:first + step] += np.bincount(rows, weights=np.ldexp(100.0, -rank), minlength=len(block))
+            cells = rows * bins + np.minimum(rank, bins - 1)
+            histogram[first:first + step] += np.bincount(cells, minlength=len(block) * bins).reshape(-1, bins)
+    return {
+        "raw": raw,
+        "normalized": raw / (200 * compiled.num_students) * 100,
+        "student_histogram": student_histogram,
+        "college_histogram": college_histogram,
+    }
+
 def satisfaction_score(solution, dataset):
     """
     Compute the raw total satisfaction score.
@@ -18,25 +78,7 @@ def satisfaction_score(solution, dataset):
       - Student: rank 0 -> 100, rank 1 -> 50, rank 2 -> 25, etc.
       - College: similarly for each admitted student.
     """
-    # Scoring functions (0-indexed rank: 0 => 100, 1 => 50, ...)
-    student_points = lambda r: 100 / (2 ** r)
-    college_points = lambda r: 100 / (2 ** r)
-    
-    total_score = 0
-
-    # Calculate student satisfaction.
-    for student, assigned_college in solution.items():
-        rank = dataset["student_preferences"][student].index(assigned_college)
-        total_score += student_points(rank)
-
-    # Calculate college satisfaction.
-    for college in dataset["colleges"]:
-        assigned_students = [s for s, c in solution.items() if c == college]
-        for student in assigned_students:
-            rank = dataset["college_preferences"][college].index(student)
-            total_score += college_points(rank)
-            
-    return total_score
+    return float(score_assignments(solution, dataset)["raw"][0])
 
 def normalized_satisfaction_score(solution, dataset):
     """
@@ -48,26 +90,157 @@ def normalized_satisfaction_score(solution, dataset):
       - 100 max from the college side,
     the maximum total raw score is 200 * (number of students).
     """
-    raw = satisfaction_score(solution, dataset)
-    num_students = len(dataset["students"])
-    max_possible = 200 * num_students  # Maximum total score if every assignment was perfect.
-    normalized = (raw / max_possible) * 100
-    return normalized
+    return float(score_assignments(solution, dataset)["normalized"][0])
+
+def _stability_report(students, targets, student_names, target_names, occupancy, capacities, sample_size):
+    return {
+        "stable": len(students) == 0 and bool((occupancy <= capacities).all()),
+        "blocking_pairs": len(students),
+        "sample": [(student_names[s], target_names[t]) for s, t in zip(students[:sample_size].tolist(),
+                                                                         targets[:sample_size].tolist())],
+        "over_capacity": {target_names[t]: int(occupancy[t]) for t in np.flatnonzero(occupancy > capacities)},
+    }
+
+def find_blocking_pairs(solution, dataset, sample_size=10, chunk_entries=1 << 22):
+    """
+    Check a matching for stability against college_preferences and capacities.
+
+    (s, c) is a blocking pair when s prefers c to its college (unassigned
+    students prefer every listed college) and c either has a free seat and
+    lists s, or ranks s above its worst admitted student. Only the list
+    prefix above each student's college is scanned and each college is
+    summarized by its worst admitted rank, so the check is linear in the
+    total preference length. Returns a dict with "stable", the number of
+    "blocking_pairs", a "sample" of (student, college) pairs and the
+    colleges filled "over_capacity".
+    """
+    compiled = ensure_compiled(dataset)
+    assignment = _as_assignments(solution, compiled)[0]
+    num_students, num_colleges = compiled.num_students, compiled.num_colleges
+    students = np.flatnonzero(assignment >= 0)
+    colleges = assignment[students]
+    occupancy = np.bincount(colleges, minlength=num_colleges)
+    worst = np.full(num_colleges, -1, dtype=np.int64)
+    np.maximum.at(worst, colleges, compiled.college_rank[colleges, students])
+    # A college with a free seat takes anyone on its list, i.e. any rank below the num_students sentinel.
+    threshold = np.where(occupancy < compiled.capacities, num_students, worst)
+    current = np.full(num_students, num_colleges, dtype=np.int64)
+    current[students] = compiled.student_rank[students, colleges]
+
+    # Walk the flat student lists in chunks of entries: entry e is position e - indptr[s] of s's list.
+    prefs = compiled.student_prefs
+    blocking_students, blocking_colleges = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for first in range(0, prefs.num_entries, chunk_entries):
+        entries = np.arange(first, min(first + chunk_entries, prefs.num_entries))
+        owners = np.searchsorted(prefs.indptr, entries, side="right") - 1
+        above = entries - prefs.indptr[owners] < current[owners]
+        s, c = owners[above], prefs.items[entries[above]].astype(np.int64)
+        blocks = compiled.college_rank[c, s] < threshold[c]
+        blocking_students.append(s[blocks])
+        blocking_colleges.append(c[blocks])
+    return _stability_report(np.concatenate(blocking_students), np.concatenate(blocking_colleges),
+                             compiled.students, compiled.colleges, occupancy, compiled.capacities, sample_size)
+
+def find_admission_blocking_pairs(solution, data, sample_size=10):
+    """
+    Stability check for admission_dataset.json matchings.
+
+    `solution` maps students to programs named as in the unified admission
+    graph: "<college>_reg" for the regular quota, "<college>_res" for the
+    reserved one (a bare college name means its regular quota). Students
+    rank a college's regular program just above its reserved one. Programs
+    rank students by student_scores and accept those at or above the
+    college's eligibility_score, and only BEA-eligible ones for reserved
+    seats. Since scores tie, a full program must strictly prefer the
+    student to its worst admitted one. Same report as find_blocking_pairs().
+    """
+    students = list(data["students"])
+    colleges = list(data["colleges"])
+    student_index = {s: i for i, s in enumerate(students)}
+    college_index = {c: j for j, c in enumerate(colleges)}
+    num_students, num_colleges = len(students), len(colleges)
+
+    # Programs: the regular ones share their college's index, the reserved ones follow.
+    capacities = [data["capacities"][c] for c in colleges]
+    reserved = np.array([cap["reserved_quota"] > 0 for cap in capacities])
+    reserved_program = np.full(num_colleges, -1, dtype=np.int64)
+    reserved_program[reserved] = num_colleges + np.arange(np.count_nonzero(reserved))
+    program_names = [f"{c}_reg" for c in colleges] + [f"{c}_res" for c, r in zip(colleges, reserved) if r]
+    program_index = {p: k for k, p in enumerate(program_names)}
+    program_index.update(college_index)
+    program_college = np.concatenate((np.arange(num_colleges), np.flatnonzero(reserved)))
+    program_capacity = np.array([cap["regular_quota"] for cap in capacities] +
+                                [cap["reserved_quota"] for cap, r in zip(capacities, reserved) if r])
+    eligibility = np.array([cap["eligibility_score"] for cap in capacities])
+    student_scores = data["student_scores"]
+    bea = np.zeros(num_students, dtype=bool)
+    bea[[student_index[s] for s in data["bea_eligible"]]] = True
+
+    # Student lists as flat (student, college, score) entries; a program's key is 2 * list position
+    # (+1 if reserved).
+    prefs = [[college_index[c] for c in data["student_preferences"][s]] for s in students]
+    lengths = np.array([len(row) for row in prefs], dtype=np.int64)
+    entry_student = np.repeat(np.arange(num_students), lengths)
+    entry_college = np.fromiter((j for row in prefs for j in row), dtype=np.int64, count=int(lengths.sum()))
+    entry_score = np.fromiter((student_scores[s].get(c, 0) for s in students for c in data["student_preferences"][s]),
+                              dtype=np.float64, count=len(entry_college))
+    position = np.arange(len(entry_college)) - (np.cumsum(lengths) - lengths)[entry_student]
+    assigned = np.array([student_index[s] for s in solution], dtype=np.int64)
+    programs = np.array([program_index[p] for p in solution.values()], dtype=np.int64)
+    # Unassigned students (or ones holding a program off their list) prefer every listed program.
+    current = np.full(num_students, 2 * int(lengths.max(initial=0)), dtype=np.int64)
+    for i, p in zip(assigned.tolist(), programs.tolist()):
+        row = prefs[i]
+        c = int(program_college[p])
+        if c in row and (p < num_colleges or bea[i]):
+            current[i] = 2 * row.index(c) + (p >= num_colleges)
+
+    occupancy = np.bincount(programs, minlength=len(program_names))
+    admitted = np.array([student_scores[students[i]].get(colleges[c], 0)
+                         for i, c in zip(assigned.tolist(), program_college[programs].tolist())], dtype=np.float64)
+    worst = np.full(len(program_names), np.inf)
+    np.minimum.at(worst, programs, admitted)
+    free = occupancy < program_capacity
+
+    regular = 2 * position < current[entry_student]
+    reserved_entry = (2 * position + 1 < current[entry_student]) & bea[entry_student]
+    reserved_entry &= reserved_program[entry_college] >= 0
+    s = np.concatenate((entry_student[regular], entry_student[reserved_entry]))
+    p = np.concatenate((entry_college[regular], reserved_program[entry_college[reserved_entry]]))
+    score = np.concatenate((entry_score[regular], entry_score[reserved_entry]))
+    blocks = (score >= eligibility[program_college[p]]) & (free[p] | (score > worst[p]))
+    order = np.argsort(s[blocks], kind="stable")
+    return _stability_report(s[blocks][order], p[blocks][order], students, program_names, occupancy,
+                             program_capacity, sample_size)
 
 if __name__ == "__main__":
     # Load the dataset and matching results.
-    dataset = load_dataset("college_student_dataset.json")
+    dataset = ensure_compiled(load_dataset("college_student_dataset.json"))
     greedy_sol = load_solution("result_greedy.json")
     sa_sol = load_solution("result_sa.json")
     ts_sol = load_solution("result_ts.json")
+    da_sol = load_solution("result_da.json")
+    da_college_sol = load_solution("result_da_colleges.json")
     
-    # Compute normalized satisfaction scores.
-    greedy_norm = normalized_satisfaction_score(greedy_sol, dataset)
-    sa_norm = normalized_satisfaction_score(sa_sol, dataset)
-    ts_norm = normalized_satisfaction_score(ts_sol, dataset)
+    # Compute normalized satisfaction scores (all solutions in one batch).
+    greedy_norm, sa_norm, ts_norm, da_norm, da_college_norm = score_assignments(
+        [greedy_sol, sa_sol, ts_sol, da_sol, da_college_sol], dataset)["normalized"]
     
     # Print a comparative summary.
     print("--- Normalized Satisfaction Scores (out of 100) ---")
     print(f"Greedy Matching Score: {greedy_norm:.2f}")
     print(f"Simulated Annealing Matching Score: {sa_norm:.2f}")
     print(f"Tabu Search Matching Score: {ts_norm:.2f}")
+    print(f"Deferred Acceptance (student-proposing) Score: {da_norm:.2f}")
+    print(f"Deferred Acceptance (college-proposing) Score: {da_college_norm:.2f}")
+
+    # Certify stability against college_preferences and capacities.
+    print("--- Stability (blocking pairs) ---")
+    for name, solution in [("Greedy", greedy_sol), ("Simulated Annealing", sa_sol), ("Tabu Search", ts_sol),
+                           ("Deferred Acceptance (student-proposing)", da_sol),
+                           ("Deferred Acceptance (college-proposing)", da_college_sol)]:
+        report = find_blocking_pairs(solution, dataset)
+        status = "stable" if report["stable"] else f"{report['blocking_pairs']} blocking pairs, e.g. {report['sample'][:3]}"
+        if report["over_capacity"]:
+            status += f", over capacity: {report['over_capacity']}"
+        print(f"{name}: {status}")
@@ -0,0 +1,162 @@
+# benchmark.py
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import admission_csr
+import analyse
+import dataset
+import dataset_college
+import fq_stable_matching
+import solve
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+def measure(fn, track_memory=True, repeat=1):
+    """
+    Time fn() as the best of `repeat` calls; with track_memory one more call
+    runs under tracemalloc to get its peak allocation (tracing would distort
+    the timing). Returns (result, seconds, peak_mb or None).
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds = min(seconds, time.perf_counter() - start)
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, seconds, peak_mb
+
+def benchmark_solvers(num_students, num_colleges, workdir, track_memory, sa_iterations, tabu_iterations, repeat=1,
+                      list_length=None):
+    path = os.path.join(workdir, f"college_{num_students}.json")
+    dataset.generate_dataset_fast(num_students, num_colleges, path, list_length=list_length)
+    compiled = solve.ensure_compiled(solve.load_dataset(path))
+    records = []
+
+    def record(stage, fn, quality):
+        result, seconds, peak_mb = measure(fn, track_memory, repeat)
+        records.append({"size": num_students, "stage": stage, "seconds": seconds, "peak_mb": peak_mb,
+                        "quality": quality(result)})
+        return result
+
+    greedy_sol = record("greedy", lambda: solve.greedy_matching(compiled),
+                        lambda sol: {"objective": solve.objective(sol, compiled)})
+    # Each run reseeds, so the timed and the memory-traced calls follow the same trajectory.
+    record("simulated_annealing",
+           lambda: solve.simulated_annealing(compiled, greedy_sol, iterations=sa_iterations, rng=random.Random(42)),
+           lambda sol: {"objective": solve.objective(sol, compiled)})
+    record("tabu_search",
+           lambda: solve.tabu_search(compiled, greedy_sol, iterations=tabu_iterations, rng=random.Random(42)),
+           lambda sol: {"objective": solve.objective(sol, compiled)})
+    record("normalized_satisfaction_score",
+           lambda: analyse.normalized_satisfaction_score(greedy_sol, compiled),
+           lambda score: {"score": score})
+    return records
+
+def benchmark_graphs(num_students, num_colleges, workdir, track_memory, repeat=1, networkx=True, list_length=None):
+    path = os.path.join(workdir, f"admission_{num_students}.json")
+    dataset_college.generate_admission_dataset_fast(num_students, num_colleges, path, list_length=list_length)
+    data = fq_stable_matching.load_admission_dataset(path)
+    records = []
+    builders = fq_stable_matching.GRAPH_BUILDERS.items() if networkx else []
+    for name, (builder, _, _) in builders:
+        (G, _), seconds, peak_mb = measure(lambda: builder(data), track_memory, repeat)
+        records.append({"size": num_students, "stage": f"{name}_admission_graph", "seconds": seconds,
+                        "peak_mb": peak_mb, "quality": fq_stable_matching.graph_stats(G)})
+    graph, seconds, peak_mb = measure(lambda: admission_csr.AdmissionCSR(data, "unified"), track_memory, repeat)
+    records.append({"size": num_students, "stage": "unified_admission_csr", "seconds": seconds, "peak_mb": peak_mb,
+                    "quality": {"nodes": graph.num_nodes, "edges": graph.num_edges}})
+    assignment, seconds, peak_mb = measure(graph.stable_matching, track_memory, repeat)
+    records.append({"size": num_students, "stage": "unified_stable_matching", "seconds": seconds,
+                    "peak_mb": peak_mb, "quality": {"placed": int((assignment >= 0).sum())}})
+    return records
+
+# Run parameters that change what a stage does; timings are only comparable when they all match.
+WORKLOAD_PARAMETERS = ("colleges", "admission_colleges", "list_length", "max_graph_students",
+                       "sa_iterations", "tabu_iterations", "repeat")
+
+def parameter_mismatches(parameters, baseline):
+    # {name: (current, baseline)} for every workload parameter the two runs disagree on.
+    base = baseline.get("parameters", {})
+    return {name: (parameters.get(name), base.get(name)) for name in WORKLOAD_PARAMETERS
+            if parameters.get(name) != base.get(name)}
+
+def compare_to_baseline(results, baseline, tolerance=0.25, min_seconds=0.01, parameters=None):
+    # A stage regresses when it is more than `tolerance` slower than the baseline run of the same size.
+    # With the current run's parameters, a baseline run with a different workload is refused.
+    if parameters is not None:
+        mismatches = parameter_mismatches(parameters, baseline)
+        if mismatches:
+            raise ValueError(f"baseline was run with different parameters (current, baseline): {mismatches}")
+    reference = {(r["size"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        base = reference.get((r["size"], r["stage"]))
+        if base is None or base["seconds"] < min_seconds:
+            continue
+        if r["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append({"size": r["size"], "stage": r["stage"], "seconds": r["seconds"],
+                                "baseline_seconds": base["seconds"], "ratio": r["seconds"] / base["seconds"]})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time greedy, SA, tabu, scoring and the admission-graph builders.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="cohort sizes (students)")
+    parser.add_argument("--colleges", type=int, default=7, help="colleges in the solver datasets")
+    parser.add_argument("--admission-colleges", type=int, default=15, help="colleges in the admission datasets")
+    parser.add_argument("--max-graph-students", type=int, default=10000,
+                        help="skip the networkx admission-graph builders above this cohort size")
+    parser.add_argument("--list-length", type=int,
+                        help="truncate every student's list to this many colleges (default: rank them all)")
+    parser.add_argument("--sa-iterations", type=int, default=100000)
+    parser.add_argument("--tabu-iterations", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3, help="time each stage as the best of this many runs")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs. the baseline")
+    args = parser.parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        mismatches = parameter_mismatches(vars(args), baseline)
+        if mismatches:
+            parser.error(f"--baseline was run with different parameters (current, baseline): {mismatches}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results += benchmark_solvers(size, args.colleges, workdir, not args.no_memory,
+                                         args.sa_iterations, args.tabu_iterations, args.repeat, args.list_length)
+            # The CSR backend and its solver run at every size, the networkx builders only up to the cap.
+            results += benchmark_graphs(size, args.admission_colleges, workdir, not args.no_memory, args.repeat,
+                                        networkx=size <= args.max_graph_students, list_length=args.list_length)
+            for r in results:
+                if r["size"] == size:
+                    peak = "" if r["peak_mb"] is None else f", peak {r['peak_mb']:.1f} MB"
+                    print(f"{size:>8} {r['stage']:<32} {r['seconds']:9.3f}s{peak}  {r['quality']}")
+
+    report = {"sizes": args.sizes, "parameters": vars(args), "results": results}
+    exit_code = 0
+    if baseline is not None:
+        report["regressions"] = compare_to_baseline(results, baseline, args.tolerance, parameters=vars(args))
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['stage']} at {r['size']}: {r['seconds']:.3f}s vs {r['baseline_seconds']:.3f}s")
+        exit_code = 1 if report["regressions"] else 0
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print("Benchmark results saved to", args.output)
+    return exit_code
+
+if __name__ == "__main__":
+    raise SystemExit(main())
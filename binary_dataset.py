@@ -0,0 +1,147 @@
+# binary_dataset.py
+import json
+import os
+import sys
+
+import numpy as np
+
+from compiled_dataset import compile_dataset, CompiledDataset, PreferenceLists, RankTable
+
+# A binary dataset is a directory of raw .npy files plus a small meta.json:
+#   students.npy / colleges.npy      ID tables (fixed-width unicode)
+#   college datasets:   capacities, student_prefs_*, student_rank*, college_prefs_*, college_rank*
+#   admission datasets: regular_quota, reserved_quota, eligibility_score, raw_scores,
+#                       student_prefs_*, student_scores, bea_eligible
+# Numeric arrays index students/colleges by their position in the ID tables. Preference lists are
+# ragged: <name>_indptr (int64) and <name>_items (int32), as in PreferenceLists; an admission
+# dataset's student_scores run parallel to its student_prefs_items, one score per listed college.
+# Rank tables are a dense int32 <name> matrix or sorted <name>_keys / <name>_values, as in RankTable,
+# so the files grow with the number of listed pairs. Arrays are memory-mapped on load, so several
+# processes can share one on-disk dataset without copying it.
+FORMAT_VERSION = 2
+
+def is_binary_dataset(path):
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+def _save(out_dir, name, array):
+    np.save(os.path.join(out_dir, f"{name}.npy"), array)
+
+def _save_lists(out_dir, name, lists):
+    _save(out_dir, f"{name}_indptr", lists.indptr)
+    _save(out_dir, f"{name}_items", lists.items)
+
+def _save_ranks(out_dir, name, table):
+    if table.dense is not None:
+        _save(out_dir, name, table.dense)
+    else:
+        _save(out_dir, f"{name}_keys", table.keys)
+        _save(out_dir, f"{name}_values", table.ranks)
+
+def _load_lists(arrays, name):
+    return PreferenceLists(arrays[f"{name}_indptr"], arrays[f"{name}_items"])
+
+def _load_ranks(arrays, name, num_items):
+    if name in arrays:
+        return RankTable(num_items, dense=arrays[name])
+    return RankTable(num_items, keys=arrays[f"{name}_keys"], ranks=arrays[f"{name}_values"])
+
+def convert_json_to_binary(input_file, out_dir):
+    with open(input_file, "r") as f:
+        dataset = json.load(f)
+    os.makedirs(out_dir, exist_ok=True)
+    students = dataset["students"]
+    colleges = dataset["colleges"]
+    _save(out_dir, "students", np.array(students, dtype=str))
+    _save(out_dir, "colleges", np.array(colleges, dtype=str))
+    meta = {"format": FORMAT_VERSION}
+
+    if "student_scores" in dataset:
+        # Admission dataset (dataset_college.py): score-based college preferences and quotas.
+        meta["kind"] = "admission"
+        meta["score_components"] = dataset["score_components"]
+        meta["college_weights"] = dataset["college_weights"]
+        student_index = {s: i for i, s in enumerate(students)}
+        college_index = {c: j for j, c in enumerate(colleges)}
+        for field in ("regular_quota", "reserved_quota", "eligibility_score"):
+            _save(out_dir, field, np.array([dataset["capacities"][c][field] for c in colleges], dtype=np.int32))
+        components = dataset["score_components"]
+        _save(out_dir, "raw_scores", np.array(
+            [[dataset["raw_scores"][s][comp] for comp in components] for s in students], dtype=np.int32))
+        preferences = dataset["student_preferences"]
+        _save_lists(out_dir, "student_prefs", PreferenceLists.from_rows(
+            [[college_index[c] for c in preferences[s]] for s in students]))
+        _save(out_dir, "student_scores", np.array(
+            [dataset["student_scores"][s][c] for s in students for c in preferences[s]], dtype=np.int32))
+        _save(out_dir, "bea_eligible", np.array([student_index[s] for s in dataset["bea_eligible"]], dtype=np.int32))
+    else:
+        meta["kind"] = "college"
+        compiled = compile_dataset(dataset)
+        _save(out_dir, "capacities", compiled.capacities.astype(np.int32))
+        _save_lists(out_dir, "student_prefs", compiled.student_prefs)
+        _save_ranks(out_dir, "student_rank", compiled.student_rank)
+        _save_lists(out_dir, "college_prefs", compiled.college_prefs)
+        _save_ranks(out_dir, "college_rank", compiled.college_rank)
+
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+    print("Binary dataset saved to", out_dir)
+
+def load_arrays(path, mmap=True):
+    # Returns (meta, {name: array}) with every array memory-mapped read-only unless mmap=False.
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported binary dataset format {meta.get('format')!r}")
+    arrays = {}
+    for entry in sorted(os.listdir(path)):
+        if entry.endswith(".npy"):
+            arrays[entry[:-4]] = np.load(os.path.join(path, entry), mmap_mode="r" if mmap else None)
+    return meta, arrays
+
+def load_compiled(path, mmap=True):
+    # Binary college dataset -> CompiledDataset whose rank tables are the memory-mapped arrays.
+    meta, arrays = load_arrays(path, mmap)
+    if meta["kind"] != "college":
+        raise ValueError(f"{path}: expected a college dataset, found {meta['kind']!r}")
+    students, colleges = arrays["students"].tolist(), arrays["colleges"].tolist()
+    return CompiledDataset.from_arrays(
+        students, colleges, arrays["capacities"],
+        _load_lists(arrays, "student_prefs"), _load_ranks(arrays, "student_rank", len(colleges)),
+        _load_lists(arrays, "college_prefs"), _load_ranks(arrays, "college_rank", len(students)),
+    )
+
+def load_admission_data(path):
+    # Binary admission dataset -> the dict layout of admission_dataset.json (no JSON parsing).
+    meta, arrays = load_arrays(path)
+    if meta["kind"] != "admission":
+        raise ValueError(f"{path}: expected an admission dataset, found {meta['kind']!r}")
+    students = arrays["students"].tolist()
+    colleges = arrays["colleges"].tolist()
+    components = meta["score_components"]
+    prefs = _load_lists(arrays, "student_prefs")
+    bounds = prefs.indptr.tolist()
+    items = [colleges[j] for j in prefs.items.tolist()]
+    scores = arrays["student_scores"].tolist()
+    preferences = [items[bounds[i]:bounds[i + 1]] for i in range(len(students))]
+    student_scores = [scores[bounds[i]:bounds[i + 1]] for i in range(len(students))]
+    capacities = {
+        c: {"regular_quota": r, "reserved_quota": q, "eligibility_score": e}
+        for c, r, q, e in zip(colleges, arrays["regular_quota"].tolist(), arrays["reserved_quota"].tolist(),
+                              arrays["eligibility_score"].tolist())
+    }
+    return {
+        "students": students,
+        "colleges": colleges,
+        "capacities": capacities,
+        "score_components": components,
+        "college_weights": meta["college_weights"],
+        "raw_scores": {s: dict(zip(components, row)) for s, row in zip(students, arrays["raw_scores"].tolist())},
+        "student_scores": {s: dict(zip(row, scores)) for s, row, scores in zip(students, preferences, student_scores)},
+        "student_preferences": dict(zip(students, preferences)),
+        "bea_eligible": [students[i] for i in arrays["bea_eligible"].tolist()],
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python binary_dataset.py <dataset.json> <output_dir>")
+    convert_json_to_binary(sys.argv[1], sys.argv[2])
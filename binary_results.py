@@ -0,0 +1,147 @@
+# binary_results.py
+import argparse
+import gzip
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from compiled_dataset import ensure_compiled
+
+# A binary result is a directory holding a small meta.json and one column: the college index of
+# every student (-1 = unassigned), in the order of the dataset's ID tables, as the smallest signed
+# integer type that fits. Uncompressed it is assignment.npy and loads memory-mapped; compressed it is
+# assignment.bin.gz, raw little-endian values read back as a stream. meta.json keeps hashes of the
+# student and college ID tables, so a result is never decoded against the wrong dataset.
+FORMAT_VERSION = 1
+
+def is_binary_result(path):
+    meta_file = os.path.join(path, "meta.json")
+    if not os.path.isfile(meta_file):
+        return False
+    with open(meta_file, "r") as f:
+        return json.load(f).get("kind") == "result"
+
+def _digest(ids):
+    return hashlib.sha256("\0".join(ids).encode()).hexdigest()
+
+def _index_dtype(num_colleges):
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_colleges <= np.iinfo(dtype).max:
+            return np.dtype(dtype).newbyteorder("<")
+    return np.dtype("<i8")
+
+def save_result(solution, out_dir, dataset, compress=False, chunk_size=1 << 20):
+    # solution: a {student: college} dict or an array of college indices.
+    compiled = ensure_compiled(dataset)
+    if isinstance(solution, dict):
+        solution = compiled.encode_solution(solution)
+    dtype = _index_dtype(compiled.num_colleges)
+    os.makedirs(out_dir, exist_ok=True)
+    for stale in ("assignment.npy", "assignment.bin.gz"):
+        if os.path.exists(os.path.join(out_dir, stale)):
+            os.remove(os.path.join(out_dir, stale))
+    if compress:
+        with gzip.open(os.path.join(out_dir, "assignment.bin.gz"), "wb", compresslevel=6) as f:
+            for start in range(0, len(solution), chunk_size):
+                f.write(np.asarray(solution[start:start + chunk_size]).astype(dtype).tobytes())
+    else:
+        np.save(os.path.join(out_dir, "assignment.npy"), np.asarray(solution).astype(dtype))
+    meta = {
+        "format": FORMAT_VERSION,
+        "kind": "result",
+        "num_students": compiled.num_students,
+        "num_colleges": compiled.num_colleges,
+        "dtype": dtype.str,
+        "compressed": bool(compress),
+        "students_sha256": _digest(compiled.students),
+        "colleges_sha256": _digest(compiled.colleges),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+def _load_meta(path, dataset=None):
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION or meta.get("kind") != "result":
+        raise ValueError(f"{path}: not a binary result (format {meta.get('format')!r})")
+    if dataset is not None:
+        compiled = ensure_compiled(dataset)
+        if (meta["students_sha256"] != _digest(compiled.students) or
+                meta["colleges_sha256"] != _digest(compiled.colleges)):
+            raise ValueError(f"{path}: result was saved against a different dataset")
+    return meta
+
+def iter_result_chunks(path, dataset=None, chunk_size=1 << 20):
+    # Yields (first student index, college indices) chunks without holding the whole column in memory.
+    meta = _load_meta(path, dataset)
+    dtype = np.dtype(meta["dtype"])
+    if not meta["compressed"]:
+        column = np.load(os.path.join(path, "assignment.npy"), mmap_mode="r")
+        for start in range(0, len(column), chunk_size):
+            yield start, np.asarray(column[start:start + chunk_size])
+        return
+    with gzip.open(os.path.join(path, "assignment.bin.gz"), "rb") as f:
+        start = 0
+        while True:
+            block = f.read(chunk_size * dtype.itemsize)
+            if not block:
+                break
+            yield start, np.frombuffer(block, dtype=dtype)
+            start += len(block) // dtype.itemsize
+
+def load_result(path, dataset=None, mmap=True):
+    # The college-index column; memory-mapped (read-only) for uncompressed results unless mmap=False.
+    meta = _load_meta(path, dataset)
+    if not meta["compressed"]:
+        return np.load(os.path.join(path, "assignment.npy"), mmap_mode="r" if mmap else None)
+    with gzip.open(os.path.join(path, "assignment.bin.gz"), "rb") as f:
+        return np.frombuffer(f.read(), dtype=np.dtype(meta["dtype"]))
+
+def convert_json_to_result(input_file, out_dir, dataset, compress=False):
+    with open(input_file, "r") as f:
+        solution = json.load(f)
+    save_result(solution, out_dir, dataset, compress)
+
+def convert_result_to_json(path, output_file, dataset, chunk_size=1 << 20):
+    # Streams the same text save_solution() writes (json.dump(..., indent=4)), chunk by chunk.
+    compiled = ensure_compiled(dataset)
+    students = compiled.students
+    college_names = [json.dumps(c) for c in compiled.colleges]
+    with open(output_file, "w") as f:
+        separator = "{\n"
+        for start, chunk in iter_result_chunks(path, compiled, chunk_size):
+            assigned = np.flatnonzero(chunk >= 0)
+            lines = [f'    {json.dumps(students[start + i])}: {college_names[j]}'
+                     for i, j in zip(assigned.tolist(), chunk[assigned].tolist())]
+            if lines:
+                f.write(separator + ",\n".join(lines))
+                separator = ",\n"
+        f.write("{}" if separator == "{\n" else "\n}")
+
+def main(argv=None):
+    from binary_dataset import is_binary_dataset, load_compiled
+
+    parser = argparse.ArgumentParser(description="Convert matching results between JSON and the binary format.")
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("source", help="result JSON file (to-binary) or binary result directory (to-json)")
+    parser.add_argument("target", help="binary result directory (to-binary) or JSON file (to-json)")
+    parser.add_argument("--dataset", default="college_student_dataset.json",
+                        help="dataset JSON file or binary dataset directory the result refers to")
+    parser.add_argument("--compress", action="store_true", help="gzip the binary column")
+    args = parser.parse_args(argv)
+
+    if is_binary_dataset(args.dataset):
+        dataset = load_compiled(args.dataset)
+    else:
+        with open(args.dataset, "r") as f:
+            dataset = json.load(f)
+    if args.direction == "to-binary":
+        convert_json_to_result(args.source, args.target, dataset, args.compress)
+    else:
+        convert_result_to_json(args.source, args.target, dataset)
+    print("Result saved to", args.target)
+
+if __name__ == "__main__":
+    main()
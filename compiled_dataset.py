@@ -0,0 +1,204 @@
+# compiled_dataset.py
+import itertools
+
+import numpy as np
+
+
+def capacity_value(capacity):
+    # Capacities are plain seat counts, but some datasets store a dict with a "quota" entry.
+    if isinstance(capacity, dict):
+        return int(capacity["quota"])
+    return int(capacity)
+
+
+class PreferenceLists:
+    """
+    Ragged preference lists in CSR form: owner o's list, best first, is
+    items[indptr[o]:indptr[o + 1]], so storage is one int per listed entry.
+
+    Indexing mirrors the -1 padded matrices it replaces: lists[o] is o's
+    list and lists[o, k] its k-th entry, or -1 past the end of the list
+    (o and k may be scalars or arrays).
+    """
+
+    def __init__(self, indptr, items):
+        self.indptr = np.asarray(indptr)
+        self.items = np.asarray(items)
+        self.lengths = np.diff(self.indptr)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: a sequence of index lists.
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        items = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int32, count=int(indptr[-1]))
+        return cls(indptr, items)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @property
+    def num_entries(self):
+        return len(self.items)
+
+    def owners(self):
+        # Owner of every entry, aligned with items.
+        return np.repeat(np.arange(len(self.lengths)), self.lengths)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            return self.items[self.indptr[key]:self.indptr[key + 1]]
+        owner, k = key
+        listed = np.asarray(k) < self.lengths[owner]
+        if not listed.any():
+            return np.full(listed.shape, -1, dtype=np.int32)[()]
+        return np.where(listed, self.items[np.where(listed, self.indptr[owner] + k, 0)], -1)[()]
+
+    def nbytes(self):
+        return self.indptr.nbytes + self.items.nbytes
+
+
+class RankTable:
+    """
+    rank[o, i]: the 0-indexed position of item i in owner o's list, or
+    num_items when o does not list i (unlisted pairs rank below every
+    listed one). o and i may be scalars or broadcastable arrays.
+
+    Stored as a dense int32 matrix when at least a quarter of all pairs are
+    listed (4 bytes per pair is then at most 16 per listed one), otherwise
+    as the sorted keys o * num_items + i with their ranks, looked up by
+    binary search; either way memory is proportional to the listed entries.
+    """
+
+    def __init__(self, num_items, dense=None, keys=None, ranks=None):
+        self.num_items = num_items
+        self.dense = dense
+        self.keys = keys
+        self.ranks = ranks
+
+    @classmethod
+    def from_lists(cls, lists, num_items):
+        owners = lists.owners()
+        ranks = (np.arange(lists.num_entries) - lists.indptr[owners]).astype(np.int32)
+        if 4 * lists.num_entries >= len(lists) * num_items:
+            dense = np.full((len(lists), num_items), num_items, dtype=np.int32)
+            dense[owners, lists.items] = ranks
+            return cls(num_items, dense=dense)
+        keys = owners * np.int64(num_items) + lists.items
+        order = np.argsort(keys, kind="stable")
+        return cls(num_items, keys=keys[order], ranks=ranks[order])
+
+    def __getitem__(self, key):
+        if self.dense is not None:
+            return self.dense[key]
+        owner, item = key
+        if isinstance(owner, (int, np.integer)) and isinstance(item, (int, np.integer)):
+            # Scalar lookups (the local searches' move deltas) skip the array machinery.
+            key = int(owner) * self.num_items + int(item)
+            k = int(self.keys.searchsorted(key))
+            return int(self.ranks[k]) if k < len(self.keys) and self.keys[k] == key else self.num_items
+        keys = np.asarray(owner, dtype=np.int64) * self.num_items + item
+        if not len(self.keys):
+            return np.full(np.shape(keys), self.num_items, dtype=np.int32)[()]
+        position = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[position] == keys, self.ranks[position], self.num_items).astype(np.int32)[()]
+
+    def nbytes(self):
+        if self.dense is not None:
+            return self.dense.nbytes
+        return self.keys.nbytes + self.ranks.nbytes
+
+
+class CompiledDataset:
+    """
+    Array-backed view of a dataset produced by load_dataset().
+
+    Students and colleges are mapped to dense integer indices (their position
+    in dataset["students"] / dataset["colleges"]). Preference lists may be
+    truncated, and a pair neither side lists is unacceptable; they are stored
+    as ragged PreferenceLists, with RankTable lookups:
+      - student_rank[i, j]: 0-indexed rank of college j in student i's list
+      - college_rank[j, i]: 0-indexed rank of student i in college j's list
+    Pairs that do not appear in a preference list get the rank len(list owner's
+    universe), i.e. they rank below every listed entry. student_prefs and
+    college_prefs hold the lists themselves (lists[o, k] is -1 past the end).
+    Memory grows with the number of listed entries, not students x colleges.
+    """
+
+    def __init__(self, dataset):
+        self.students = list(dataset["students"])
+        self.colleges = list(dataset["colleges"])
+        self.student_index = {s: i for i, s in enumerate(self.students)}
+        self.college_index = {c: j for j, c in enumerate(self.colleges)}
+
+        self.capacities = np.array(
+            [capacity_value(dataset["capacities"][c]) for c in self.colleges], dtype=np.int64
+        )
+
+        # Student -> college lists and ranks.
+        self.student_prefs = PreferenceLists.from_rows(
+            [[self.college_index[c] for c in dataset["student_preferences"][s]] for s in self.students]
+        )
+        self.student_rank = RankTable.from_lists(self.student_prefs, self.num_colleges)
+
+        # College -> student lists and ranks (empty for datasets that derive them from scores).
+        college_preferences = dataset.get("college_preferences", {})
+        self.college_prefs = PreferenceLists.from_rows(
+            [[self.student_index[s] for s in college_preferences.get(c, ())] for c in self.colleges]
+        )
+        self.college_rank = RankTable.from_lists(self.college_prefs, self.num_students)
+
+    @classmethod
+    def from_arrays(cls, students, colleges, capacities, student_prefs, student_rank, college_prefs, college_rank):
+        # Builds a CompiledDataset around existing PreferenceLists / RankTables (e.g. over memory-mapped
+        # arrays) without copying them.
+        compiled = cls.__new__(cls)
+        compiled.students = list(students)
+        compiled.colleges = list(colleges)
+        compiled.student_index = {s: i for i, s in enumerate(compiled.students)}
+        compiled.college_index = {c: j for j, c in enumerate(compiled.colleges)}
+        compiled.capacities = np.asarray(capacities, dtype=np.int64)
+        compiled.student_prefs = student_prefs
+        compiled.student_rank = student_rank
+        compiled.college_prefs = college_prefs
+        compiled.college_rank = college_rank
+        return compiled
+
+    @property
+    def num_students(self):
+        return len(self.students)
+
+    @property
+    def num_colleges(self):
+        return len(self.colleges)
+
+    def nbytes(self):
+        # Bytes held by the preference and rank storage.
+        return sum(table.nbytes() for table in (self.student_prefs, self.student_rank,
+                                                self.college_prefs, self.college_rank))
+
+    def encode_solution(self, solution):
+        # {student: college} -> int array of college indices (-1 = unassigned).
+        assignment = np.full(self.num_students, -1, dtype=np.int32)
+        for s, c in solution.items():
+            assignment[self.student_index[s]] = self.college_index[c]
+        return assignment
+
+    def decode_solution(self, assignment):
+        # Inverse of encode_solution(); unassigned students are left out, as greedy_matching does.
+        return {
+            self.students[i]: self.colleges[j]
+            for i, j in enumerate(assignment.tolist())
+            if j >= 0
+        }
+
+
+def compile_dataset(dataset):
+    return CompiledDataset(dataset)
+
+
+def ensure_compiled(dataset):
+    # Lets every entry point accept either the raw JSON dict or a CompiledDataset.
+    if isinstance(dataset, CompiledDataset):
+        return dataset
+    return CompiledDataset(dataset)
@@ -2,8 +2,23 @@
 import json
 import random
 
-def generate_dataset(num_students=10, num_colleges=3, output_file="college_student_dataset.json"):
+import numpy as np
+
+def sample_preference_rows(rng, num_rows, num_items, length):
+    # num_rows random lists of `length` distinct items out of num_items, drawn with Floyd's subset
+    # sampling and then shuffled, in O(num_rows * length^2) without ever touching all num_items.
+    rows = np.empty((num_rows, length), dtype=np.int64)
+    for k, top in enumerate(range(num_items - length, num_items)):
+        pick = rng.integers(0, top + 1, size=num_rows)
+        taken = (rows[:, :k] == pick[:, None]).any(axis=1)
+        rows[:, k] = np.where(taken, top, pick)
+    return rng.permuted(rows, axis=1)
+
+def generate_dataset(num_students=10, num_colleges=3, output_file="college_student_dataset.json", list_length=None):
+    # list_length: if set (and below num_colleges), each student ranks only that many random colleges
+    # and each college ranks only the students who listed it; every other pair is unacceptable.
     random.seed(42)  # For reproducibility
+    truncated = list_length is not None and list_length < num_colleges
 
     # Generate student and college IDs
     students = [f"S{i+1}" for i in range(num_students)]
@@ -19,14 +34,22 @@ def generate_dataset(num_students=10, num_colleges=3, output_file="college_stude
     # Generate student preferences: each student gets a random ordering of all colleges.
     student_prefs = {}
     for s in students:
+        if truncated:
+            student_prefs[s] = random.sample(colleges, list_length)
+            continue
         prefs = colleges.copy()
         random.shuffle(prefs)
         student_prefs[s] = prefs
 
-    # Generate college preferences: each college gets a random ordering of all students.
+    # Generate college preferences: each college gets a random ordering of all students (of its applicants).
+    applicants = {c: [] for c in colleges}
+    if truncated:
+        for s in students:
+            for c in student_prefs[s]:
+                applicants[c].append(s)
     college_prefs = {}
     for c in colleges:
-        prefs = students.copy()
+        prefs = applicants[c] if truncated else students.copy()
         random.shuffle(prefs)
         college_prefs[c] = prefs
 
@@ -44,5 +67,79 @@ def generate_dataset(num_students=10, num_colleges=3, output_file="college_stude
         json.dump(dataset, f, indent=4)
     print("Dataset generated and saved to", output_file)
 
+def _write_id_list(f, prefix, indices, chunk_size):
+    # Writes ["<prefix><i+1>", ...] for the given 0-based indices, chunk_size entries at a time.
+    f.write("[")
+    for start in range(0, len(indices), chunk_size):
+        if start:
+            f.write(",")
+        f.write(",".join(f'"{prefix}{i + 1}"' for i in indices[start:start + chunk_size].tolist()))
+    f.write("]")
+
+def generate_dataset_fast(num_students=10, num_colleges=3, output_file="college_student_dataset.json",
+                          seed=42, chunk_size=100_000, list_length=None):
+    """
+    Vectorized, streaming variant of generate_dataset() for very large cohorts.
+
+    Same layout and distributions (capacities 2-5 topped up to fit every
+    student, random total orders on both sides), but drawn with a seeded
+    NumPy Generator and written chunk by chunk as compact JSON, so the full
+    document is never held in memory. Every chunk draws from its own
+    Generator keyed by (seed, stream, chunk), which keeps the output
+    independent of how the work is split into sections.
+
+    list_length truncates the lists as in generate_dataset(); the college
+    lists are then built from the (student, college) applications, which
+    is the only part kept in memory, O(num_students * list_length).
+    """
+    truncated = list_length is not None and list_length < num_colleges
+    rng = np.random.default_rng([seed, 0])
+    capacities = rng.integers(2, 6, size=num_colleges)
+    if capacities.sum() < num_students:
+        capacities[0] += num_students - capacities.sum()
+    college_ids = [f'"C{j + 1}"' for j in range(num_colleges)]
+    college_json = np.array(college_ids)
+    student_range = np.arange(num_students)
+    applications = []
+
+    with open(output_file, "w") as f:
+        f.write('{"students": ')
+        _write_id_list(f, "S", student_range, chunk_size)
+        f.write(', "colleges": [' + ",".join(college_ids) + "]")
+        f.write(', "capacities": {' + ",".join(f"{c}: {int(q)}" for c, q in zip(college_ids, capacities)) + "}")
+
+        # Student preferences: each student gets a random ordering of all colleges.
+        f.write(', "student_preferences": {')
+        for k, start in enumerate(range(0, num_students, chunk_size)):
+            stop = min(start + chunk_size, num_students)
+            chunk_rng = np.random.default_rng([seed, 1, k])
+            if truncated:
+                prefs = sample_preference_rows(chunk_rng, stop - start, num_colleges, list_length)
+                applications.append(prefs.astype(np.int32))
+            else:
+                prefs = chunk_rng.permuted(np.tile(np.arange(num_colleges), (stop - start, 1)), axis=1)
+            if start:
+                f.write(",")
+            f.write(",".join(f'"S{start + r + 1}": [' + ",".join(row) + "]"
+                             for r, row in enumerate(college_json[prefs].tolist())))
+        f.write("}")
+
+        # College preferences: each college gets a random ordering of all students (of its applicants).
+        if truncated:
+            applied = np.concatenate(applications).ravel() if applications else np.empty(0, dtype=np.int32)
+            by_college = np.argsort(applied, kind="stable")
+            bounds = np.searchsorted(applied[by_college], np.arange(num_colleges + 1))
+            applicants = by_college // max(list_length, 1)
+        f.write(', "college_preferences": {')
+        for j in range(num_colleges):
+            if truncated:
+                order = np.random.default_rng([seed, 2, j]).permutation(applicants[bounds[j]:bounds[j + 1]])
+            else:
+                order = np.random.default_rng([seed, 2, j]).permutation(num_students)
+            f.write(("," if j else "") + f"{college_ids[j]}: ")
+            _write_id_list(f, "S", order, chunk_size)
+        f.write("}}")
+    print("Dataset generated and saved to", output_file)
+
 if __name__ == "__main__":
     generate_dataset(100,7)
@@ -1,8 +1,15 @@
 import random
 import json
 
-def generate_admission_dataset(num_students=10, num_colleges=5, seed=42):
+import numpy as np
+
+from dataset import sample_preference_rows
+
+def generate_admission_dataset(num_students=10, num_colleges=5, seed=42, list_length=None):
+    # list_length: if set (and below num_colleges), each student lists only that many random colleges
+    # and gets student_scores for those alone.
     random.seed(seed)  # For reproducibility
+    truncated = list_length is not None and list_length < num_colleges
     
     # Students: a1, a2, ..., aN
     students = [f"a{i+1}" for i in range(num_students)]
@@ -46,11 +53,22 @@ def generate_admission_dataset(num_students=10, num_colleges=5, seed=42):
             "eligibility_score": eligibility_score
         }
     
+    # Student preferences: strict total order
+    student_preferences = {}
+    for s in students:
+        if truncated:
+            student_preferences[s] = random.sample(colleges, list_length)
+            continue
+        # Shuffle colleges for a random permutation
+        pref = colleges.copy()
+        random.shuffle(pref)
+        student_preferences[s] = pref
+
     # Compute weighted scores
     student_scores = {}
     for s in students:
         scores = {}
-        for c in colleges:
+        for c in student_preferences[s] if truncated else colleges:
             score = sum(
                 college_weights[c][comp] * raw_scores[s][comp]
                 for comp in score_components
@@ -59,14 +77,6 @@ def generate_admission_dataset(num_students=10, num_colleges=5, seed=42):
             scores[c] = round(score)
         student_scores[s] = scores
     
-    # Student preferences: strict total order
-    student_preferences = {}
-    for s in students:
-        # Shuffle colleges for a random permutation
-        pref = colleges.copy()
-        random.shuffle(pref)
-        student_preferences[s] = pref
-    
     # BEA eligibility: ~30% of students
     bea_eligible = random.sample(students, k=max(1, num_students // 3))
     
@@ -85,6 +95,112 @@ def generate_admission_dataset(num_students=10, num_colleges=5, seed=42):
     
     return dataset
 
+def _write_student_map(f, num_students, chunk_size, rows):
+    # Streams {"a1": <row 0>, "a2": <row 1>, ...}; rows(start, stop) yields the JSON text of each value.
+    f.write("{")
+    for start in range(0, num_students, chunk_size):
+        stop = min(start + chunk_size, num_students)
+        if start:
+            f.write(",")
+        f.write(",".join(f'"a{start + r + 1}": {row}' for r, row in enumerate(rows(start, stop))))
+    f.write("}")
+
+def generate_admission_dataset_fast(num_students=10, num_colleges=5, output_file="admission_dataset.json",
+                                    seed=42, chunk_size=100_000, list_length=None):
+    """
+    Vectorized, streaming variant of generate_admission_dataset().
+
+    Draws the same quantities (raw scores, college weights and capacities,
+    weighted student_scores, preference permutations, ~1/3 BEA-eligible)
+    with seeded NumPy Generators and writes compact JSON chunk by chunk, so
+    memory stays O(chunk_size * num_colleges) apart from the BEA sample.
+    Per-student values come from a Generator keyed by (seed, stream, chunk),
+    so raw scores can be regenerated for the student_scores section instead
+    of being kept around. With list_length the preference lists are
+    truncated as in generate_admission_dataset() and student_scores only
+    cover the listed colleges, so the work is O(num_students * list_length).
+    """
+    truncated = list_length is not None and list_length < num_colleges
+    students_json = lambda start, stop: ",".join(f'"a{i + 1}"' for i in range(start, stop))
+    colleges = [f"C{i+1}" for i in range(num_colleges)]
+    score_components = ["Math", "Language", "Grades"]
+    college_json = np.array([f'"{c}"' for c in colleges])
+
+    # College weights and capacities
+    rng = np.random.default_rng([seed, 0])
+    w1 = rng.uniform(0.2, 0.5, num_colleges)
+    w2 = rng.uniform(0.2, 0.5, num_colleges)
+    w3 = 1.0 - w1 - w2
+    low = w3 < 0.2
+    w3[low] = 0.2
+    w1[low] = w1[low] * 0.8 / (w1[low] + w2[low])
+    w2[low] = w2[low] * 0.8 / (w1[low] + w2[low])
+    weights = np.round(np.stack([w1, w2, w3], axis=1), 2)  # (colleges, components)
+    regular_quota = rng.integers(50, 101, num_colleges)
+    reserved_quota = rng.integers(0, 11, num_colleges)
+    eligibility_score = rng.integers(60, 81, num_colleges)
+
+    def raw_scores(start, stop):
+        # Raw scores for students [start, stop) (50-100 per component), regenerated on demand.
+        chunk_rng = np.random.default_rng([seed, 1, start // chunk_size])
+        return chunk_rng.integers(50, 101, size=(stop - start, len(score_components)))
+
+    # One %-template per section, so each row is formatted in a single call.
+    raw_template = "{" + ",".join(f'"{comp}": %d' for comp in score_components) + "}"
+    score_template = "{" + ",".join(f"{c}: %d" for c in college_json) + "}"
+
+    def raw_rows(start, stop):
+        return (raw_template % tuple(row) for row in raw_scores(start, stop).tolist())
+
+    def preferences(start, stop):
+        # Preference lists for students [start, stop) as college indices, regenerated on demand.
+        chunk_rng = np.random.default_rng([seed, 2, start // chunk_size])
+        if truncated:
+            return sample_preference_rows(chunk_rng, stop - start, num_colleges, list_length)
+        return chunk_rng.permuted(np.tile(np.arange(num_colleges), (stop - start, 1)), axis=1)
+
+    def score_rows(start, stop):
+        # Weighted scores, rounded to the nearest integer for ties.
+        if truncated:
+            prefs = preferences(start, stop)
+            scores = np.rint(np.einsum("rk,rck->rc", raw_scores(start, stop), weights[prefs])).astype(np.int64)
+            return ("{" + ",".join(f"{c}: {v}" for c, v in zip(names, row)) + "}"
+                    for names, row in zip(college_json[prefs].tolist(), scores.tolist()))
+        scores = np.rint(raw_scores(start, stop) @ weights.T).astype(np.int64)
+        return (score_template % tuple(row) for row in scores.tolist())
+
+    def preference_rows(start, stop):
+        prefs = preferences(start, stop)
+        return ("[" + ",".join(row) + "]" for row in college_json[prefs].tolist())
+
+    # BEA eligibility: ~30% of students
+    bea_eligible = np.random.default_rng([seed, 3]).choice(
+        num_students, size=max(1, num_students // 3), replace=False)
+
+    with open(output_file, "w") as f:
+        f.write('{"students": [')
+        for start in range(0, num_students, chunk_size):
+            f.write(("," if start else "") + students_json(start, min(start + chunk_size, num_students)))
+        f.write('], "colleges": [' + ",".join(college_json) + "]")
+        f.write(', "capacities": {' + ",".join(
+            f'{c}: {{"regular_quota": {int(r)}, "reserved_quota": {int(q)}, "eligibility_score": {int(e)}}}'
+            for c, r, q, e in zip(college_json, regular_quota, reserved_quota, eligibility_score)) + "}")
+        f.write(', "score_components": ' + json.dumps(score_components))
+        f.write(', "college_weights": ' + json.dumps(
+            {c: dict(zip(score_components, w)) for c, w in zip(colleges, weights.tolist())}))
+        f.write(', "raw_scores": ')
+        _write_student_map(f, num_students, chunk_size, raw_rows)
+        f.write(', "student_scores": ')
+        _write_student_map(f, num_students, chunk_size, score_rows)
+        f.write(', "student_preferences": ')
+        _write_student_map(f, num_students, chunk_size, preference_rows)
+        f.write(', "bea_eligible": [')
+        for start in range(0, len(bea_eligible), chunk_size):
+            f.write(("," if start else "") + ",".join(
+                f'"a{i + 1}"' for i in bea_eligible[start:start + chunk_size].tolist()))
+        f.write("]}")
+    print("Dataset saved as", output_file)
+
 # Generate and save dataset
 if __name__ == "__main__":
     dataset = generate_admission_dataset()
@@ -0,0 +1,72 @@
+# derived_cache.py
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+def content_key(kind, *parts):
+    # Cache key: the kind plus a SHA-256 over the JSON encoding of everything the cached value depends on.
+    digest = hashlib.sha256(kind.encode())
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(json.dumps(part, sort_keys=True, separators=(",", ":")).encode())
+    return f"{kind}-{digest.hexdigest()[:32]}"
+
+
+class DerivedCache:
+    """
+    Content-addressed on-disk cache for values derived from a dataset.
+
+    Each entry is an .npz archive of integer arrays plus a JSON "meta"
+    string, named after its content_key(); a key changes whenever one of
+    the inputs it was computed from does, so stale entries are never read,
+    they just age out. Hits refresh the file's mtime and store() evicts the
+    least recently used entries once the directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory=".fq_cache", max_bytes=256 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def load(self, key):
+        # Returns (meta, arrays) for a stored key, or None on a miss.
+        path = self._path(key)
+        try:
+            with np.load(path) as archive:
+                arrays = {name: archive[name] for name in archive.files}
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return json.loads(str(arrays.pop("meta"))), arrays
+
+    def store(self, key, meta=None, **arrays):
+        tmp_file = self._path(key) + ".tmp"
+        with open(tmp_file, "wb") as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_file, self._path(key))  # Readers never see a half-written entry.
+        self.evict()
+
+    def entries(self):
+        # (mtime, size, path) of every entry, least recently used first.
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
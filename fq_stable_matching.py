@@ -1,15 +1,36 @@
-import networkx as nx
-import matplotlib.pyplot as plt
+import argparse
 import json
 
-# Load dataset
-with open("admission_dataset.json", "r") as f:
-    data = json.load(f)
+import numpy as np
+
+from admission_csr import AdmissionCSR
+from derived_cache import DerivedCache, content_key
+
+# networkx and matplotlib are imported inside the functions that need them, so importing
+# this module stays cheap and side-effect free (e.g. in headless batch workers).
+
+def load_admission_dataset(input_file="admission_dataset.json"):
+    # A binary dataset directory (see binary_dataset.py) is read from its arrays instead of JSON.
+    from binary_dataset import is_binary_dataset, load_admission_data
+    if is_binary_dataset(input_file):
+        return load_admission_data(input_file)
+    with open(input_file, "r") as f:
+        data = json.load(f)
+    return data
 
 def derive_college_preferences(data, colleges):
+    # A college's list holds the students who list it, at or above its eligibility score, by score
+    # (best first, ties in dataset order); unlisted students are unacceptable to it anyway, so the work
+    # scales with the applications. This is a single sort per college, cheaper than hashing its inputs
+    # for a cache lookup, so only the built graphs are cached.
+    applicants = {c: [] for c in colleges}
+    for s in data["students"]:
+        for c in data["student_preferences"][s]:
+            if c in applicants:
+                applicants[c].append(s)
     college_prefs = {}
     for c in colleges:
-        students_scores = [(s, data["student_scores"][s].get(c, 0)) for s in data["students"]]
+        students_scores = [(s, data["student_scores"][s].get(c, 0)) for s in applicants[c]]
         students_scores.sort(key=lambda x: x[1], reverse=True)
         score_groups = {}
         for s, score in students_scores:
@@ -23,25 +44,67 @@ def derive_college_preferences(data, colleges):
         college_prefs[c] = pref_list
     return college_prefs
 
-def create_regular_admission_graph(data):
+def add_college_edges(edges, p, pref_list, score_map, compact=True):
+    # Edges point from a student to every student the program likes at least as much
+    # (score_map[s_j] >= score_map[s_i]). With compact=True that relation is encoded as
+    # a cycle through each tie group plus one edge from each tie group's head to the next
+    # better group's head, which keeps the same reachability with a linear edge count
+    # (the same edges as admission_csr.AdmissionCSR).
+    if not compact:
+        for s_i in pref_list:
+            for s_j in pref_list:
+                if s_i != s_j and score_map[s_j] >= score_map[s_i]:
+                    edges.append(((p, s_i), (p, s_j)))
+        return
+    groups = []
+    for s in pref_list:  # pref_list is sorted by score, best first.
+        if groups and score_map[groups[-1][0]] == score_map[s]:
+            groups[-1].append(s)
+        else:
+            groups.append([s])
+    for k, group in enumerate(groups):
+        if len(group) > 1:
+            for s_i, s_j in zip(group, group[1:] + group[:1]):
+                edges.append(((p, s_i), (p, s_j)))
+        if k > 0:
+            edges.append(((p, group[0]), (p, groups[k - 1][0])))
+
+def graph_stats(G):
+    return {"nodes": G.number_of_nodes(), "edges": G.number_of_edges()}
+
+def compare_graph_builders(data):
+    # Node and edge counts of each admission graph built with all-pairs vs. tie-group cycle edges.
+    stats = {}
+    for name, builder in (("regular", create_regular_admission_graph),
+                          ("bea", create_bea_admission_graph),
+                          ("unified", create_unified_admission_graph)):
+        stats[name] = {
+            "all_pairs": graph_stats(builder(data, compact=False)[0]),
+            "compact": graph_stats(builder(data, compact=True)[0]),
+        }
+    return stats
+
+def create_regular_admission_graph(data, compact=True):
+    import networkx as nx
     G = nx.DiGraph()
     colleges = data["colleges"]
+    college_set = set(colleges)
     college_prefs = derive_college_preferences(data, colleges)
 
     # Nodes: (c, s) for regular seats
-    nodes = []
+    nodes = {}  # Insertion-ordered set of nodes, for O(1) membership tests.
     for s in data["students"]:
         for c in data["student_preferences"][s]:
-            if (c in colleges and
+            if (c in college_set and
                 data["student_scores"][s][c] >= data["capacities"][c]["eligibility_score"]):
-                nodes.append((c, s))
+                nodes[(c, s)] = None
     G.add_nodes_from(nodes)
 
     # Edges
     edges = []
     # Student preferences (vertical)
     for s in data["students"]:
-        pref_list = [c for c in data["student_preferences"][s] if c in colleges]
+        pref_list = [c for c in data["student_preferences"][s] if c in college_set]
         for i in range(len(pref_list) - 1):
             c_higher = pref_list[i]
             c_lower = pref_list[i + 1]
@@ -49,37 +112,33 @@ def create_regular_admission_graph(data):
                 edges.append(((c_lower, s), (c_higher, s)))
     # College preferences (horizontal)
     for c in colleges:
-        pref_list = college_prefs[c]
+        pref_list = [s for s in college_prefs[c] if (c, s) in nodes]
         score_map = {s: data["student_scores"][s][c] for s in pref_list}
-        for i in range(len(pref_list)):
-            s_i = pref_list[i]
-            for j in range(len(pref_list)):
-                s_j = pref_list[j]
-                if i != j and (c, s_i) in nodes and (c, s_j) in nodes:
-                    if score_map[s_j] >= score_map[s_i]:
-                        edges.append(((c, s_i), (c, s_j)))
+        add_college_edges(edges, c, pref_list, score_map, compact)
     G.add_edges_from(edges)
     return G, colleges
 
-def create_bea_admission_graph(data):
+def create_bea_admission_graph(data, compact=True):
+    import networkx as nx
     G = nx.DiGraph()
     colleges = [c for c in data["colleges"] if data["capacities"][c]["reserved_quota"] > 0]
+    college_set = set(colleges)
     college_prefs = derive_college_preferences(data, colleges)
 
     # Nodes: (c, s) for reserved seats, BEA-eligible students
-    nodes = []
+    nodes = {}  # Insertion-ordered set of nodes, for O(1) membership tests.
     for s in data["bea_eligible"]:
         for c in data["student_preferences"][s]:
-            if (c in colleges and
+            if (c in college_set and
                 data["student_scores"][s][c] >= data["capacities"][c]["eligibility_score"]):
-                nodes.append((c, s))
+                nodes[(c, s)] = None
     G.add_nodes_from(nodes)
 
     # Edges
     edges = []
     # Student preferences
     for s in data["bea_eligible"]:
-        pref_list = [c for c in data["student_preferences"][s] if c in colleges]
+        pref_list = [c for c in data["student_preferences"][s] if c in college_set]
         for i in range(len(pref_list) - 1):
             c_higher = pref_list[i]
             c_lower = pref_list[i + 1]
@@ -87,20 +146,16 @@ def create_bea_admission_graph(data):
                 edges.append(((c_lower, s), (c_higher, s)))
     # College preferences
     for c in colleges:
-        pref_list = [s for s in college_prefs[c] if s in data["bea_eligible"]]
+        pref_list = [s for s in college_prefs[c] if (c, s) in nodes]
         score_map = {s: data["student_scores"][s][c] for s in pref_list}
-        for i in range(len(pref_list)):
-            s_i = pref_list[i]
-            for j in range(len(pref_list)):
-                s_j = pref_list[j]
-                if i != j and (c, s_i) in nodes and (c, s_j) in nodes:
-                    if score_map[s_j] >= score_map[s_i]:
-                        edges.append(((c, s_i), (c, s_j)))
+        add_college_edges(edges, c, pref_list, score_map, compact)
     G.add_edges_from(edges)
     return G, colleges
 
-def create_unified_admission_graph(data):
+def create_unified_admission_graph(data, compact=True):
+    import networkx as nx
     G = nx.DiGraph()
+    bea_eligible = set(data["bea_eligible"])
     programs = []
     program_eligibility = {}
     program_to_college = {}
@@ -114,38 +169,24 @@ def create_unified_admission_graph(data):
             program_to_college[f"{c}_res"] = c
     
     # Derive preferences for programs
+    college_prefs = derive_college_preferences(data, data["colleges"])
     program_prefs = {}
     for c in data["colleges"]:
-        students_scores = [(s, data["student_scores"][s].get(c, 0)) for s in data["students"]]
-        students_scores.sort(key=lambda x: x[1], reverse=True)
-        score_groups = {}
-        for s, score in students_scores:
-            if score >= data["capacities"][c]["eligibility_score"]:
-                if score not in score_groups:
-                    score_groups[score] = []
-                score_groups[score].append(s)
-        pref_list = []
-        for score in sorted(score_groups.keys(), reverse=True):
-            pref_list.extend(score_groups[score])
-        program_prefs[f"{c}_reg"] = pref_list
-        if f"{c}_res" in programs:
-            bea_pref_list = [s for s in pref_list if s in data["bea_eligible"]]
-            program_prefs[f"{c}_res"] = bea_pref_list
+        program_prefs[f"{c}_reg"] = college_prefs[c]
+        if f"{c}_res" in program_to_college:
+            program_prefs[f"{c}_res"] = [s for s in college_prefs[c] if s in bea_eligible]
 
-    # Nodes: (p, s)
-    nodes = []
+    # Nodes: (p, s), each student's regular programs and then its reserved ones, in program order.
+    college_position = {c: k for k, c in enumerate(data["colleges"])}
+    nodes = {}  # Insertion-ordered set of nodes, for O(1) membership tests.
     for s in data["students"]:
-        for p in [p for p in programs if "_reg" in p]:
-            c = program_to_college[p]
-            if (c in data["student_preferences"][s] and
-                data["student_scores"][s][c] >= program_eligibility[p]):
-                nodes.append((p, s))
-        if s in data["bea_eligible"]:
-            for p in [p for p in programs if "_res" in p]:
-                c = program_to_college[p]
-                if (c in data["student_preferences"][s] and
-                    data["student_scores"][s][c] >= program_eligibility[p]):
-                    nodes.append((p, s))
+        listed = sorted({c for c in data["student_preferences"][s] if c in college_position},
+                        key=college_position.get)
+        for suffix in ("_reg", "_res") if s in bea_eligible else ("_reg",):
+            for c in listed:
+                p = c + suffix
+                if p in program_to_college and data["student_scores"][s][c] >= program_eligibility[p]:
+                    nodes[(p, s)] = None
     G.add_nodes_from(nodes)
 
     # Edges
@@ -154,9 +195,9 @@ def create_unified_admission_graph(data):
     for s in data["students"]:
         pref_list = []
         for c in data["student_preferences"][s]:
-            if f"{c}_reg" in programs:
+            if f"{c}_reg" in program_to_college:
                 pref_list.append(f"{c}_reg")
-            if s in data["bea_eligible"] and f"{c}_res" in programs:
+            if s in bea_eligible and f"{c}_res" in program_to_college:
                 pref_list.append(f"{c}_res")
         for i in range(len(pref_list) - 1):
             p_higher = pref_list[i]
@@ -165,53 +206,217 @@ def create_unified_admission_graph(data):
                 edges.append(((p_lower, s), (p_higher, s)))
     # Program preferences
     for p in programs:
-        pref_list = program_prefs[p]
         c = program_to_college[p]
+        pref_list = [s for s in program_prefs[p] if (p, s) in nodes]
         score_map = {s: data["student_scores"][s][c] for s in pref_list}
-        for i in range(len(pref_list)):
-            s_i = pref_list[i]
-            for j in range(len(pref_list)):
-                s_j = pref_list[j]
-                if i != j and (p, s_i) in nodes and (p, s_j) in nodes:
-                    if score_map[s_j] >= score_map[s_i]:
-                        edges.append(((p, s_i), (p, s_j)))
+        add_college_edges(edges, p, pref_list, score_map, compact)
     G.add_edges_from(edges)
     return G, programs
 
-def visualize_and_save_graph(G, colleges_or_programs, filename, title):
+def layout_indexes(data, colleges_or_programs):
+    # Precomputed grid positions: students along x, colleges/programs along y.
+    student_pos = {s: i for i, s in enumerate(data["students"])}
+    program_pos = {p: k for k, p in enumerate(colleges_or_programs)}
+    return student_pos, program_pos
+
+def _label_axes(plt, data, colleges_or_programs, title):
+    students = data["students"]
+    step = max(50, len(students) // 20)
+    plt.xticks(range(0, len(students), step),
+              [students[i] for i in range(0, len(students), step)],
+              fontsize=8, rotation=45)
+    plt.yticks([-i for i in range(len(colleges_or_programs))],
+              colleges_or_programs, fontsize=8)
+    plt.xlabel("Students (a)", fontsize=10)
+    plt.ylabel("Colleges/Programs (c)", fontsize=10)
+    plt.title(title, fontsize=12)
+
+def visualize_and_save_graph(G, colleges_or_programs, filename, title, data):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     plt.figure(figsize=(30, 12))  # Large figure for 1000 students
     # Grid layout: students on x-axis (top), colleges/programs on y-axis (left)
-    pos = {}
-    for (p, s) in G.nodes():
-        x = data["students"].index(s)
-        y = -colleges_or_programs.index(p)  # Negative to have C1 at top
-        pos[(p, s)] = (x, y)
+    student_pos, program_pos = layout_indexes(data, colleges_or_programs)
+    pos = {(p, s): (student_pos[s], -program_pos[p]) for (p, s) in G.nodes()}  # Negative to have C1 at top
     
     # Draw graph
     nx.draw(G, pos, with_labels=False, node_size=50, node_color='lightblue',
             font_size=6, font_weight='bold', arrowsize=8)
     
     # Customize axes
-    plt.xticks(range(0, len(data["students"]), 50), 
-              [data["students"][i] for i in range(0, len(data["students"]), 50)], 
-              fontsize=8, rotation=45)
-    plt.yticks([-i for i in range(len(colleges_or_programs))], 
-              colleges_or_programs, fontsize=8)
-    plt.xlabel("Students (a)", fontsize=10)
-    plt.ylabel("Colleges/Programs (c)", fontsize=10)
-    plt.title(title, fontsize=12)
+    _label_axes(plt, data, colleges_or_programs, title)
     
     # Save image
     plt.savefig(filename, format='png', dpi=300, bbox_inches='tight')
     plt.close()
     print(f"Saved graph as {filename}")
 
-# Generate and save graphs
-G_regular, colleges = create_regular_admission_graph(data)
-visualize_and_save_graph(G_regular, colleges, "regular_admission_graph.png", "Regular Admission Graph (Gr)")
+def render_graph_summary(G, colleges_or_programs, filename, title, data, mode="raster",
+                         max_columns=2000, max_edges=200000, dpi=100):
+    """
+    Fast alternative to visualize_and_save_graph() for large cohorts.
+
+    mode="raster": every node adds 1 + its degree to a (programs x students)
+      density raster; students are binned into at most max_columns columns,
+      so memory is bounded by len(colleges_or_programs) * max_columns.
+    mode="chain": draws the tie-group chain edges (within a program, from a
+      student to one with a strictly higher score; in the compact builders,
+      each tie group's head to the next better group's head) as one batched
+      LineCollection, plus the nodes as a single scatter. Above max_edges a
+      uniform sample is drawn, and the title says how many were dropped.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    student_pos, program_pos = layout_indexes(data, colleges_or_programs)
+    num_students = len(data["students"])
+    num_rows = len(colleges_or_programs)
+    xs = np.fromiter((student_pos[s] for _, s in G.nodes()), dtype=np.int64, count=G.number_of_nodes())
+    ys = np.fromiter((program_pos[p] for p, _ in G.nodes()), dtype=np.int64, count=G.number_of_nodes())
+
+    fig, ax = plt.subplots(figsize=(20, 8))
+    if mode == "raster":
+        columns = max(1, min(num_students, max_columns))
+        weights = 1.0 + np.fromiter((d for _, d in G.degree()), dtype=np.float64, count=len(xs))
+        raster = np.zeros((num_rows, columns))
+        np.add.at(raster, (ys, xs * columns // max(num_students, 1)), weights)
+        image = ax.imshow(np.log1p(raster), aspect="auto", cmap="viridis", interpolation="nearest",
+                          extent=(-0.5, num_students - 0.5, -num_rows + 0.5, 0.5))
+        fig.colorbar(image, ax=ax, label="log(1 + nodes + degree)")
+    elif mode == "chain":
+        scores = data["student_scores"]
+        college_of = {p: p if p in data["capacities"] else p.rsplit("_", 1)[0] for p in colleges_or_programs}
+        chain = [((student_pos[s1], -program_pos[p1]), (student_pos[s2], -program_pos[p2]))
+                 for (p1, s1), (p2, s2) in G.edges()
+                 if p1 == p2 and scores[s2][college_of[p2]] > scores[s1][college_of[p1]]]
+        segments = chain
+        if len(chain) > max_edges:
+            keep = np.sort(np.random.default_rng(0).choice(len(chain), max_edges, replace=False))
+            segments = [chain[k] for k in keep.tolist()]
+            title = f"{title} ({max_edges} of {len(chain)} chain edges drawn)"
+            print(f"Chain render: drew a uniform sample of {max_edges} of {len(chain)} chain edges")
+        ax.add_collection(LineCollection(segments, linewidths=0.2, colors="gray", alpha=0.3))
+        ax.scatter(xs, -ys, s=2, c="tab:blue", linewidths=0)
+        ax.set_xlim(-0.5, num_students - 0.5)
+        ax.set_ylim(-num_rows + 0.5, 0.5)
+    else:
+        raise ValueError(f"mode must be 'raster' or 'chain', got {mode!r}")
+
+    _label_axes(plt, data, colleges_or_programs, title)
+    fig.savefig(filename, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved graph summary as {filename}")
+
+GRAPH_BUILDERS = {
+    "regular": (create_regular_admission_graph, "regular_admission_graph.png", "Regular Admission Graph (Gr)"),
+    "bea": (create_bea_admission_graph, "bea_admission_graph.png", "BEA Admission Graph (Gr)"),
+    "unified": (create_unified_admission_graph, "unified_admission_graph.png", "Unified Admission Graph"),
+}
+
+# Dataset fields the admission graphs are built from; a graph is cached under a hash of all of them.
+GRAPH_INPUTS = ("students", "colleges", "capacities", "student_scores", "student_preferences", "bea_eligible")
+
+def _graph_to_arrays(G, colleges_or_programs, data):
+    # Compact form: nodes as (program index, student index) rows, edges as node-index pairs.
+    program_pos = {p: k for k, p in enumerate(colleges_or_programs)}
+    student_pos = {s: i for i, s in enumerate(data["students"])}
+    node_pos = {node: k for k, node in enumerate(G.nodes())}
+    nodes = np.array([(program_pos[p], student_pos[s]) for p, s in G.nodes()], dtype=np.int32).reshape(-1, 2)
+    edges = np.array([(node_pos[u], node_pos[v]) for u, v in G.edges()], dtype=np.int32).reshape(-1, 2)
+    return {"colleges_or_programs": colleges_or_programs}, {"nodes": nodes, "edges": edges}
+
+def _graph_from_arrays(meta, arrays, data):
+    import networkx as nx
+    colleges_or_programs = meta["colleges_or_programs"]
+    students = data["students"]
+    nodes = [(colleges_or_programs[p], students[s]) for p, s in arrays["nodes"].tolist()]
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from((nodes[u], nodes[v]) for u, v in arrays["edges"].tolist())
+    return G, colleges_or_programs
+
+def _graph_key(name, data, compact):
+    edge_scheme = "tie-cycles" if compact else "all-pairs"
+    return content_key(f"{name}_graph", edge_scheme, *(data[field] for field in GRAPH_INPUTS))
+
+def admission_graph_arrays(name, data, compact=True, cache=None):
+    # GRAPH_BUILDERS[name] in compact form, (meta, {"nodes", "edges"}), served from the cache when possible.
+    # Loading these arrays takes milliseconds; turning them back into a networkx graph does not.
+    key = _graph_key(name, data, compact)
+    hit = cache.load(key) if cache else None
+    if hit:
+        return hit
+    G, colleges_or_programs = GRAPH_BUILDERS[name][0](data, compact)
+    meta, arrays = _graph_to_arrays(G, colleges_or_programs, data)
+    if cache:
+        cache.store(key, meta, **arrays)
+    return meta, arrays
+
+def build_admission_graph(name, data, compact=True, cache=None):
+    # GRAPH_BUILDERS[name](data, compact), loaded from / stored in a DerivedCache when one is given.
+    builder = GRAPH_BUILDERS[name][0]
+    if cache is None:
+        return builder(data, compact)
+    key = _graph_key(name, data, compact)
+    hit = cache.load(key)
+    if hit:
+        return _graph_from_arrays(*hit, data)
+    G, colleges_or_programs = builder(data, compact)
+    meta, arrays = _graph_to_arrays(G, colleges_or_programs, data)
+    cache.store(key, meta, **arrays)
+    return G, colleges_or_programs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build (and optionally render) the admission graphs.")
+    parser.add_argument("--dataset", default="admission_dataset.json", help="admission dataset JSON file or binary dataset directory")
+    parser.add_argument("--graphs", nargs="+", choices=list(GRAPH_BUILDERS), default=list(GRAPH_BUILDERS),
+                        help="which graphs to build")
+    parser.add_argument("--no-render", action="store_true", help="build the graphs without drawing PNGs")
+    parser.add_argument("--render-mode", choices=["full", "raster", "chain"], default="full",
+                        help="full networkx drawing, or a fast raster/chain summary for large cohorts")
+    parser.add_argument("--cache-dir", default=".fq_cache", help="cache of built admission graphs")
+    parser.add_argument("--cache-size-mb", type=float, default=256, help="evict old cache entries above this size")
+    parser.add_argument("--no-cache", action="store_true", help="always rebuild, without reading or writing the cache")
+    parser.add_argument("--backend", choices=["networkx", "csr"], default="networkx",
+                        help="networkx graphs, or integer CSR arrays (admission_csr.py, rendered as raster/chain summaries)")
+    parser.add_argument("--solve", metavar="OUTPUT",
+                        help="also compute the stable matching over the unified programs and save it as JSON")
+    args = parser.parse_args(argv)
 
-G_bea, bea_colleges = create_bea_admission_graph(data)
-visualize_and_save_graph(G_bea, bea_colleges, "bea_admission_graph.png", "BEA Admission Graph (Gr)")
+    data = load_admission_dataset(args.dataset)
+    cache = None if args.no_cache else DerivedCache(args.cache_dir, int(args.cache_size_mb * 2**20))
+    # Generate and save graphs
+    for name in args.graphs:
+        _, filename, title = GRAPH_BUILDERS[name]
+        if args.backend == "csr":
+            graph = AdmissionCSR(data, name)
+            print(f"{name}: {graph.num_nodes} nodes, {graph.num_edges} edges ({graph.nbytes() / 2**20:.1f} MB)")
+            if not args.no_render:
+                render_graph_summary(graph.to_networkx(), graph.programs, filename, title, data,
+                                     mode="chain" if args.render_mode == "chain" else "raster")
+            continue
+        if args.no_render:
+            # Counting needs only the compact arrays, not a networkx graph.
+            _, arrays = admission_graph_arrays(name, data, cache=cache)
+            print(f"{name}: {len(arrays['nodes'])} nodes, {len(arrays['edges'])} edges")
+            continue
+        G, colleges_or_programs = build_admission_graph(name, data, cache=cache)
+        stats = graph_stats(G)
+        print(f"{name}: {stats['nodes']} nodes, {stats['edges']} edges")
+        if args.render_mode == "full":
+            visualize_and_save_graph(G, colleges_or_programs, filename, title, data)
+        else:
+            render_graph_summary(G, colleges_or_programs, filename, title, data, mode=args.render_mode)
+    if args.solve:
+        solution = AdmissionCSR(data, "unified").solution()
+        with open(args.solve, "w") as f:
+            json.dump(solution, f, indent=4)
+        print(f"Stable matching ({len(solution)} of {len(data['students'])} students placed) saved to {args.solve}")
 
-G_unified, programs = create_unified_admission_graph(data)
-visualize_and_save_graph(G_unified, programs, "unified_admission_graph.png", "Unified Admission Graph")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# instrumentation.py
+import contextlib
+import json
+import time
+
+
+class SearchStats:
+    """
+    Opt-in instrumentation for simulated_annealing() and tabu_search().
+
+    Pass an instance as `stats=` to collect:
+      - phase timers (seconds spent in "setup", "search" and "decode"),
+      - move counters (proposed / accepted / rejected / tabu_blocked /
+        improved, i.e. new bests),
+      - the iteration and temperature of the last new best (the plateau),
+      - a trace of (iteration, current cost, best cost, temperature),
+        sampled every `sample_every` iterations (0 disables the trace).
+    The search loops only compare the iteration number against the next
+    sample point, so running without stats costs next to nothing.
+    """
+
+    def __init__(self, sample_every=1000):
+        self.sample_every = sample_every
+        self.timers = {}
+        self.counters = {}
+        self.trace = {"iteration": [], "cost": [], "best_cost": [], "temperature": []}
+        self.last_improvement = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+
+    def first_sample(self):
+        # Iteration of the first trace sample; -1 never matches a loop index.
+        return 0 if self.sample_every > 0 else -1
+
+    def sample(self, iteration, cost, best_cost, temperature=None):
+        self.trace["iteration"].append(iteration)
+        self.trace["cost"].append(cost)
+        self.trace["best_cost"].append(best_cost)
+        self.trace["temperature"].append(temperature)
+        return iteration + self.sample_every
+
+    def count(self, **counts):
+        for name, value in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def improved(self, iteration, temperature=None):
+        self.last_improvement = {"iteration": iteration, "temperature": temperature}
+
+    def summary(self):
+        proposed = self.counters.get("proposed", 0)
+        return {
+            "timers": dict(self.timers),
+            "counters": dict(self.counters),
+            "acceptance_rate": self.counters.get("accepted", 0) / proposed if proposed else None,
+            "last_improvement": self.last_improvement,
+        }
+
+    def write(self, output_file):
+        # Compact log: one JSON document without indentation, the trace stored column-wise.
+        with open(output_file, "w") as f:
+            json.dump({**self.summary(), "sample_every": self.sample_every, "trace": self.trace}, f,
+                      separators=(",", ":"))
+
+
+class _NullStats:
+    # Stand-in used when instrumentation is off: same interface, no recording.
+    sample_every = 0
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def first_sample(self):
+        return -1
+
+    def sample(self, iteration, cost, best_cost, temperature=None):
+        return -1
+
+    def count(self, **counts):
+        pass
+
+    def improved(self, iteration, temperature=None):
+        pass
+
+
+NULL_STATS = _NullStats()
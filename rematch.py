@@ -0,0 +1,246 @@
+# rematch.py
+import bisect
+import heapq
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from compiled_dataset import ensure_compiled
+
+UNRANKED = float("inf")
+
+
+class IncrementalMatching:
+    """
+    A stable matching kept up to date under small changes to the market.
+
+    Start from a stable assignment (by default the student-proposing
+    deferred acceptance one) and apply() deltas, dicts with a "kind":
+      - {"kind": "capacity", "college": c, "capacity": n}
+      - {"kind": "withdraw", "student": s}
+      - {"kind": "add_student", "student": s, "preferences": [c, ...],
+         "college_positions": {c: p, ...}}: s enters c's list just above
+         the student at position p of its original list (and below earlier
+         additions there); colleges left out do not list s.
+      - {"kind": "preferences", "student": s, "preferences": [c, ...]}
+    Lost seats (a capacity cut, a competing newcomer) are repaired by
+    letting the displaced students continue proposing down their lists, as
+    deferred acceptance would have. Freed seats (more capacity, a withdrawal)
+    are refilled by vacancy chains: the seat goes to the best student on the
+    college's list who prefers it, whose old seat is refilled the same way.
+    Both steps keep the matching stable and only touch the students and
+    colleges along the chains. apply() returns the students whose college
+    changed.
+    """
+
+    def __init__(self, dataset, assignment=None):
+        self.compiled = compiled = ensure_compiled(dataset)
+        if assignment is None:
+            from solve import deferred_acceptance
+            assignment = deferred_acceptance(compiled)
+        if isinstance(assignment, dict):
+            assignment = compiled.encode_solution(assignment)
+        self.students = list(compiled.students)
+        self.student_index = dict(compiled.student_index)
+        self.assignment = [int(j) for j in assignment]
+        self.active = [True] * len(self.students)
+        self.capacities = compiled.capacities.tolist()
+        self.occupancy = np.bincount(assignment[assignment >= 0], minlength=compiled.num_colleges).tolist()
+        # Members grouped by college, turned into heaps only for the colleges a repair touches.
+        assigned = np.flatnonzero(assignment >= 0)
+        order = assigned[np.argsort(assignment[assigned], kind="stable")]
+        bounds = np.searchsorted(assignment[order], np.arange(compiled.num_colleges + 1))
+        self._members = [order[bounds[j]:bounds[j + 1]] for j in range(compiled.num_colleges)]
+        self._heaps = {}
+        self._entry = [0] * len(self.students)  # Heap entries of earlier seats go stale.
+        self._lists = {}  # Edited or added students' preference lists.
+        self._added_ranks = {}  # Added students' positions in college lists.
+        self._added = {}  # Per college, its added students as sorted (rank, student) pairs.
+        self._before = {}
+
+    def solution(self):
+        return {self.students[i]: self.compiled.colleges[j] for i, j in enumerate(self.assignment) if j >= 0}
+
+    # Preference lookups, with edits and additions layered over the compiled arrays.
+    def _student_list(self, i):
+        if i in self._lists:
+            return self._lists[i][0]
+        return self.compiled.student_prefs[i].tolist()
+
+    def _student_rank(self, i, j):
+        if j < 0:
+            return UNRANKED
+        if i in self._lists:
+            return self._lists[i][1].get(j, UNRANKED)
+        r = int(self.compiled.student_rank[i, j])
+        return r if r < self.compiled.num_colleges else UNRANKED
+
+    def _college_rank(self, j, i):
+        if i in self._added_ranks:
+            return self._added_ranks[i].get(j, UNRANKED)
+        r = int(self.compiled.college_rank[j, i])
+        return r if r < self.compiled.num_students else UNRANKED
+
+    def _college_list(self, j, after):
+        # j's list as (rank, student) pairs ranked below `after`, original students and added ones merged.
+        # Original students' ranks are their list positions, so the scan starts right at the cut.
+        if after == UNRANKED:
+            return iter(())
+        row = self.compiled.college_prefs[j]
+        added = self._added.get(j, [])
+        added = added[bisect.bisect_right(added, after, key=lambda entry: entry[0]):]
+        original = ((p, int(row[p])) for p in range(math.floor(after) + 1, len(row)))
+        return heapq.merge(original, added)
+
+    # Seat bookkeeping.
+    def _heap(self, j):
+        # Built once per touched college, in O(its occupancy), and kept up to date across deltas.
+        if j not in self._heaps:
+            members = self._members[j].tolist()
+            ranks = self.compiled.college_rank[j, members].tolist()
+            heap = [(-r, i, self._entry[i]) for r, i in zip(ranks, members) if self.assignment[i] == j]
+            heapq.heapify(heap)
+            self._heaps[j] = heap
+        return self._heaps[j]
+
+    def _next_position(self, i, j):
+        # Where student i resumes proposing after losing its seat at j.
+        r = self._student_rank(i, j)
+        return r + 1 if r != UNRANKED else len(self._student_list(i))
+
+    def _move(self, i, j):
+        heap = self._heap(j) if j >= 0 else None  # Built before i counts as a member of j.
+        old = self.assignment[i]
+        self._before.setdefault(i, old)
+        if old >= 0:
+            self.occupancy[old] -= 1
+        self._entry[i] += 1
+        self.assignment[i] = j
+        if j >= 0:
+            self.occupancy[j] += 1
+            heapq.heappush(heap, (-self._college_rank(j, i), i, self._entry[i]))
+
+    def _worst(self, j):
+        # Pops stale entries until the top of j's heap is its worst current admit: (rank, student).
+        heap = self._heap(j)
+        while heap[0][2] != self._entry[heap[0][1]]:
+            heapq.heappop(heap)
+        return -heap[0][0], heap[0][1]
+
+    # Repairs.
+    def _propose(self, proposers):
+        # Deferred acceptance continued from a stable state: (student, list position) pairs propose onwards.
+        while proposers:
+            i, k = proposers.pop()
+            prefs = self._student_list(i)
+            target = -1
+            for j in prefs[k:]:
+                r = self._college_rank(j, i)
+                if r == UNRANKED or self.capacities[j] == 0:
+                    continue
+                if self.occupancy[j] < self.capacities[j]:
+                    target = j
+                    break
+                worst_rank, worst = self._worst(j)
+                if r < worst_rank:
+                    self._move(worst, -1)
+                    proposers.append((worst, self._next_position(worst, j)))
+                    target = j
+                    break
+            self._move(i, target)
+
+    def _fill_vacancies(self, colleges):
+        # Vacancy chains. Apart from the open seat the matching is stable, so every student who prefers j
+        # ranks below j's worst admit, and students only improve along a chain, so one passed over by j
+        # stays ineligible: each scan starts below both and stops at the first taker.
+        scanned = {}
+        while colleges:
+            j = colleges.pop()
+            while self.occupancy[j] < self.capacities[j]:
+                after = scanned.get(j, -1)
+                if self.occupancy[j]:
+                    after = max(after, self._worst(j)[0])
+                taker = -1
+                for after, i in self._college_list(j, after):
+                    if self.active[i] and self._student_rank(i, j) < self._student_rank(i, self.assignment[i]):
+                        taker = i
+                        break
+                scanned[j] = after
+                if taker < 0:
+                    break
+                old = self.assignment[taker]
+                self._move(taker, j)
+                if old >= 0:
+                    colleges.append(old)
+
+    def _withdraw(self, i):
+        j = self.assignment[i]
+        self.active[i] = False
+        self._move(i, -1)
+        if j >= 0:
+            self._fill_vacancies([j])
+
+    def _set_list(self, i, colleges):
+        prefs = [self.compiled.college_index[c] for c in colleges]
+        self._lists[i] = (prefs, {j: r for r, j in enumerate(prefs)})
+
+    def apply(self, delta):
+        self._before = {}
+        kind = delta["kind"]
+        if kind == "capacity":
+            j = self.compiled.college_index[delta["college"]]
+            if delta["capacity"] < 0:
+                raise ValueError(f"capacity must be non-negative, got {delta['capacity']}")
+            self.capacities[j] = int(delta["capacity"])
+            displaced = []
+            while self.occupancy[j] > self.capacities[j]:
+                _, worst = self._worst(j)
+                self._move(worst, -1)
+                displaced.append((worst, self._next_position(worst, j)))
+            self._propose(displaced)
+            self._fill_vacancies([j])
+        elif kind == "withdraw":
+            self._withdraw(self.student_index[delta["student"]])
+        elif kind == "preferences":
+            i = self.student_index[delta["student"]]
+            self._withdraw(i)
+            self._set_list(i, delta["preferences"])
+            self.active[i] = True
+            self._propose([(i, 0)])
+        elif kind == "add_student":
+            if delta["student"] in self.student_index:
+                raise ValueError(f"student {delta['student']!r} is already in the dataset")
+            i = len(self.students)
+            self.students.append(delta["student"])
+            self.student_index[delta["student"]] = i
+            self.assignment.append(-1)
+            self.active.append(True)
+            self._entry.append(0)
+            self._set_list(i, delta["preferences"])
+            positions = {self.compiled.college_index[c]: p for c, p in delta.get("college_positions", {}).items()}
+            # Strictly between positions p - 1 and p, and below earlier additions at the same position.
+            offset = Fraction(1, 2 + len(self._added_ranks))
+            self._added_ranks[i] = {j: p - offset for j, p in positions.items()}
+            for j, r in self._added_ranks[i].items():
+                bisect.insort(self._added.setdefault(j, []), (r, i))
+            self._propose([(i, 0)])
+        else:
+            raise ValueError(f"unknown delta kind {kind!r}")
+        return {self.students[i] for i, old in self._before.items() if self.assignment[i] != old}
+
+
+def rematch(dataset, previous_solution, deltas):
+    """
+    Repair `previous_solution` (a stable {student: college} matching) after
+    one delta or a list of them; see IncrementalMatching for the delta
+    kinds. Returns (updated solution, students whose college changed).
+    Keep an IncrementalMatching around instead to amortize its setup over
+    a stream of deltas.
+    """
+    matching = IncrementalMatching(dataset, previous_solution)
+    touched = set()
+    for delta in [deltas] if isinstance(deltas, dict) else deltas:
+        touched |= matching.apply(delta)
+    solution = matching.solution()
+    return solution, {s for s in touched if previous_solution.get(s) != solution.get(s)}
@@ -1,34 +1,52 @@
 # solve_methods.py
+import copy
 import json
 import random
 import math
+import heapq
+import os
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+
+from binary_dataset import is_binary_dataset, load_compiled
+from compiled_dataset import ensure_compiled
+from instrumentation import NULL_STATS
 
 def load_dataset(input_file="college_student_dataset.json"):
+    # A binary dataset directory (see binary_dataset.py) loads as a memory-mapped CompiledDataset.
+    if is_binary_dataset(input_file):
+        return load_compiled(input_file)
     with open(input_file, "r") as f:
         dataset = json.load(f)
     return dataset
 
 def greedy_matching(dataset):
+    compiled = ensure_compiled(dataset)
     # Use a copy of the capacities so the original dataset remains unchanged.
-    capacities = dataset["capacities"].copy()
+    capacities = compiled.capacities.tolist()
     assignment = {}  # Mapping: student -> college
 
-    for student in dataset["students"]:
+    for i, student in enumerate(compiled.students):
         # Choose the highest-ranked college (by student's preference) with available capacity.
-        for college in dataset["student_preferences"][student]:
-            if capacities[college] > 0:
-                assignment[student] = college
-                capacities[college] -= 1
+        for j in compiled.student_prefs[i].tolist():
+            if capacities[j] > 0:
+                assignment[student] = compiled.colleges[j]
+                capacities[j] -= 1
                 break
     return assignment
 
 def objective(solution, dataset):
     # A simple internal objective: the sum of the index (0-indexed dissatisfaction) over student preferences.
-    total = 0
-    for student, college in solution.items():
-        rank = dataset["student_preferences"][student].index(college)
-        total += rank
-    return total
+    compiled = ensure_compiled(dataset)
+    return assignment_cost(compiled, compiled.encode_solution(solution))
+
+def assignment_cost(compiled, assignment):
+    # objective() on an encoded assignment array.
+    assigned = np.flatnonzero(assignment >= 0)
+    return int(compiled.student_rank[assigned, assignment[assigned]].sum())
 
 def get_neighbor(solution):
     new_solution = solution.copy()
@@ -43,7 +61,311 @@ def get_neighbor_with_move(solution):
     move = (s1, s2)
     return new_solution, move
 
-def simulated_annealing(dataset, initial_solution, iterations=1000, initial_temp=100, cooling_rate=0.95):
+class BestTracker:
+    """
+    Keeps the best assignment seen by a local search without copying the
+    current assignment on every improvement.
+
+    Writes applied to the current assignment are recorded as (student, college)
+    pairs; on a new best they are replayed onto the stored best. If the trail
+    grows past ~2n writes without a new best, it is dropped and the next new
+    best is taken as a plain copy, so the cost stays amortized O(1) per move.
+    """
+
+    def __init__(self, assignment, cost):
+        self.assignment = assignment.copy()
+        self.cost = cost
+        self.trail = []
+        self.limit = 2 * len(assignment) + 16
+        self.detached = False
+
+    def record(self, student, college):
+        if self.detached:
+            return
+        self.trail.append((student, college))
+        if len(self.trail) > self.limit:
+            self.trail.clear()
+            self.detached = True
+
+    def offer(self, current, cost):
+        if cost >= self.cost:
+            return False
+        if self.detached:
+            self.assignment = current.copy()
+            self.detached = False
+        else:
+            for student, college in self.trail:
+                self.assignment[student] = college
+        self.trail.clear()
+        self.cost = cost
+        return True
+
+def swap_delta(compiled, assignment, s1, s2):
+    # Objective change from swapping the colleges of students s1 and s2; only their two terms move.
+    rank = compiled.student_rank
+    c1 = assignment[s1]
+    c2 = assignment[s2]
+    return int(rank[s1, c2]) + int(rank[s2, c1]) - int(rank[s1, c1]) - int(rank[s2, c2])
+
+def apply_swap(assignment, s1, s2, tracker=None):
+    assignment[s1], assignment[s2] = assignment[s2], assignment[s1]
+    if tracker is not None:
+        tracker.record(s1, assignment[s1])
+        tracker.record(s2, assignment[s2])
+
+class IndexPool:
+    """
+    A set of indices in range(size) with O(1) add/remove and uniform
+    sampling, scalar or vectorized: the members packed at the front of an
+    array plus each member's position in it.
+    """
+
+    def __init__(self, size, members):
+        members = np.asarray(members, dtype=np.int64)
+        self.count = len(members)
+        self.members = np.zeros(size, dtype=np.int64)
+        self.members[:self.count] = members
+        self.position = np.full(size, -1, dtype=np.int64)
+        self.position[members] = np.arange(self.count)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, index):
+        if self.position[index] < 0:
+            self.position[index] = self.count
+            self.members[self.count] = index
+            self.count += 1
+
+    def remove(self, index):
+        k = self.position[index]
+        if k >= 0:
+            self.count -= 1
+            last = self.members[self.count]
+            self.members[k] = last
+            self.position[last] = k
+            self.position[index] = -1
+
+    def pick(self, u):
+        return int(self.members[int(u * self.count)])
+
+    def sample(self, u):
+        return self.members[(u * self.count).astype(np.int64)]
+
+class MoveIndex:
+    """
+    Live occupancy index behind the swap, relocate and ejection-chain moves.
+
+    College c owns a block of max(capacity, occupancy) seats starting at
+    start[c]: its students fill seats[start[c]:start[c] + occupancy[c]] and
+    the rest of the block is free (-1); slot[s] is student s's seat.
+    open_colleges holds the colleges with a free seat and unhappy the
+    students not at their first choice, so move candidates are drawn in
+    O(1) and relocations never exceed capacities. A student with an empty
+    list has no better choice and never counts as unhappy. Every move
+    updates the assignment in place and records it on the given BestTracker.
+    """
+
+    def __init__(self, compiled, assignment, checkpoint=None):
+        self.assignment = assignment
+        self.rank = compiled.student_rank
+        self.lengths = compiled.student_prefs.lengths
+        self.capacity = compiled.capacities
+        num_colleges = compiled.num_colleges
+        assigned = np.flatnonzero(assignment >= 0)
+        self.occupancy = np.bincount(assignment[assigned], minlength=num_colleges)
+        if checkpoint is None:
+            block = np.maximum(self.capacity, self.occupancy)
+            self.start = np.concatenate(([0], np.cumsum(block)[:-1]))
+            order = assigned[np.argsort(assignment[assigned], kind="stable")]
+            colleges = assignment[order]
+            filled_before = np.concatenate(([0], np.cumsum(self.occupancy)[:-1]))
+            self.seats = np.full(int(block.sum()), -1, dtype=np.int64)
+            self.seats[self.start[colleges] + np.arange(len(order)) - filled_before[colleges]] = order
+            open_colleges = np.flatnonzero(self.occupancy < self.capacity)
+            unhappy = assigned[(self.rank[assigned, assignment[assigned]] > 0) & (self.lengths[assigned] > 0)]
+        else:
+            # Blocks keep the layout they were sized with, even where a college has since shrunk.
+            self.start = checkpoint["start"]
+            self.seats = checkpoint["seats"]
+            open_colleges = checkpoint["open_colleges"]
+            unhappy = checkpoint["unhappy"]
+        self.slot = np.full(len(assignment), -1, dtype=np.int64)
+        held = np.flatnonzero(self.seats >= 0)
+        self.slot[self.seats[held]] = held
+        self.open_colleges = IndexPool(num_colleges, open_colleges)
+        self.unhappy = IndexPool(len(assignment), unhappy)
+
+    def checkpoint_arrays(self):
+        return {
+            "start": self.start,
+            "seats": self.seats,
+            "open_colleges": self.open_colleges.members[:len(self.open_colleges)],
+            "unhappy": self.unhappy.members[:len(self.unhappy)],
+        }
+
+    def has_free_seat(self, college):
+        return self.occupancy[college] < self.capacity[college]
+
+    def member(self, college, u):
+        # A random student of `college` for a uniform u in [0, 1); -1 if it is empty.
+        occupancy = self.occupancy[college]
+        return int(self.seats[self.start[college] + int(u * occupancy)]) if occupancy else -1
+
+    def members(self, colleges, u):
+        # Vectorized member(): one student per entry of `colleges`.
+        occupancy = self.occupancy[colleges]
+        picked = self.seats[np.minimum(self.start[colleges] + (u * occupancy).astype(np.int64), len(self.seats) - 1)]
+        return np.where(occupancy > 0, picked, -1)
+
+    def _refresh(self, student):
+        if self.rank[student, self.assignment[student]] > 0 and self.lengths[student] > 0:
+            self.unhappy.add(student)
+        else:
+            self.unhappy.remove(student)
+
+    def swap(self, a, b, tracker):
+        apply_swap(self.assignment, a, b, tracker)
+        slot_a, slot_b = self.slot[a], self.slot[b]
+        self.seats[slot_a], self.seats[slot_b] = b, a
+        self.slot[a], self.slot[b] = slot_b, slot_a
+        self._refresh(a)
+        self._refresh(b)
+
+    def relocate(self, student, college, tracker):
+        # Moves `student` into a free seat of `college`; the caller checks has_free_seat().
+        current = self.assignment[student]
+        k = self.slot[student]
+        last = self.start[current] + self.occupancy[current] - 1
+        moved = self.seats[last]
+        self.seats[k] = moved
+        self.slot[moved] = k
+        self.seats[last] = -1
+        self.occupancy[current] -= 1
+        if self.occupancy[current] < self.capacity[current]:
+            self.open_colleges.add(int(current))
+        k = self.start[college] + self.occupancy[college]
+        self.seats[k] = student
+        self.slot[student] = k
+        self.occupancy[college] += 1
+        if self.occupancy[college] >= self.capacity[college]:
+            self.open_colleges.remove(college)
+        self.assignment[student] = college
+        tracker.record(student, college)
+        self._refresh(student)
+
+    def eject(self, student, college, ejected, destination, tracker):
+        # Ejection chain: `ejected` leaves the full `college` for a free seat at `destination`,
+        # then `student` takes the seat it vacated.
+        self.relocate(ejected, destination, tracker)
+        self.relocate(student, college, tracker)
+
+class SearchBudget:
+    """
+    Stopping rules and checkpointing for anytime runs of SA and tabu search.
+
+    time_budget: wall-clock seconds; max_evaluations: move evaluations;
+    stall_iterations: stop after this many iterations without a new best.
+    With checkpoint_file set, the current and best assignments, costs,
+    search state and RNG state are saved every checkpoint_every iterations
+    and when the run stops, so it can continue via resume_from=. Limits are
+    polled every check_every iterations, so a run may overshoot a budget by
+    fewer than check_every iterations.
+    """
+
+    def __init__(self, time_budget=None, max_evaluations=None, stall_iterations=None,
+                 checkpoint_file=None, checkpoint_every=10000, check_every=256):
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+        self.stall_iterations = stall_iterations
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_every = checkpoint_every
+        self.check_every = check_every
+        self.deadline = None
+        self.next_checkpoint = None
+
+    def start(self, iteration):
+        # Called when the search loop starts; returns the first iteration to poll at.
+        if self.time_budget is not None:
+            self.deadline = time.monotonic() + self.time_budget
+        self.next_checkpoint = iteration + self.checkpoint_every
+        return iteration
+
+    def poll(self, iteration, evaluations, last_improvement, save):
+        """
+        Returns (stop, next poll iteration); save() writes a checkpoint.
+        """
+        if self.checkpoint_file is not None and iteration >= self.next_checkpoint:
+            save()
+            self.next_checkpoint = iteration + self.checkpoint_every
+        stop = (
+            (self.deadline is not None and time.monotonic() >= self.deadline)
+            or (self.max_evaluations is not None and evaluations >= self.max_evaluations)
+            or (self.stall_iterations is not None and iteration - last_improvement >= self.stall_iterations)
+        )
+        return stop, iteration + self.check_every
+
+    def finish(self, save):
+        if self.checkpoint_file is not None:
+            save()
+
+def save_checkpoint(checkpoint_file, method, iteration, assignment, best, state, rng, **arrays):
+    # Arrays (the assignments plus any extra ones passed in) go into an .npz archive;
+    # the JSON-serializable search state and RNG state are stored alongside them as a JSON string.
+    meta = {
+        "method": method,
+        "iteration": iteration,
+        "best_cost": best.cost,
+        "state": state,
+        "rng_state": rng.getstate(),
+    }
+    arrays.update(assignment=assignment, best=best.assignment, meta=np.array(json.dumps(meta)))
+    tmp_file = checkpoint_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, checkpoint_file)  # Never leave a half-written checkpoint behind.
+
+def load_checkpoint(checkpoint_file):
+    with np.load(checkpoint_file) as archive:
+        checkpoint = json.loads(str(archive["meta"]))
+        for name in archive.files:
+            if name != "meta":
+                checkpoint[name] = archive[name].copy()
+    version, internal, gauss = checkpoint["rng_state"]
+    checkpoint["rng_state"] = (version, tuple(internal), gauss)
+    return checkpoint
+
+def _resume(compiled, checkpoint, method, rng):
+    # Restores (assignment, BestTracker, state, iteration) from a checkpoint and rewinds rng.
+    if checkpoint["method"] != method:
+        raise ValueError(f"checkpoint is for {checkpoint['method']!r}, not {method!r}")
+    assignment = checkpoint["assignment"]
+    best = BestTracker(checkpoint["best"], checkpoint["best_cost"])
+    best.detached = True  # The current assignment differs from the best one: no trail to replay.
+    rng.setstate(checkpoint["rng_state"])
+    return assignment, best, checkpoint["state"], checkpoint["iteration"]
+
+def simulated_annealing(dataset, initial_solution, iterations=1000, initial_temp=100, cooling_rate=0.95,
+                        incremental=True, rng=None, stats=None, budget=None, resume_from=None, relocate_rate=0.5):
+    # rng: a random.Random for an independent stream; defaults to the global random module.
+    # stats: an instrumentation.SearchStats to fill (incremental mode only).
+    # budget: a SearchBudget for time/evaluation limits, early stopping and checkpoints; with a budget,
+    # iterations=None runs until the budget is spent. resume_from: a checkpoint file to continue from
+    # (initial_solution is then ignored). Both need incremental mode. relocate_rate: share of
+    # iterations proposing relocate / ejection-chain moves instead of random swaps (incremental mode).
+    dataset = ensure_compiled(dataset)
+    if incremental:
+        stats = stats or NULL_STATS
+        rng = rng or random
+        with stats.phase("setup"):
+            resume = load_checkpoint(resume_from) if resume_from else None
+            assignment = None if resume else dataset.encode_solution(initial_solution)
+        best = _simulated_annealing_incremental(dataset, assignment, iterations, initial_temp, cooling_rate,
+                                                rng, stats, budget, resume, relocate_rate)
+        with stats.phase("decode"):
+            return dataset.decode_solution(best.assignment)
+    if stats is not None or budget is not None or resume_from is not None:
+        raise ValueError("stats, budget and resume_from require incremental=True")
     current_solution = initial_solution
     current_cost = objective(current_solution, dataset)
     temperature = initial_temp
@@ -55,7 +377,8 @@ def simulated_annealing(dataset, initial_solution, iterations=1000, initial_temp
         neighbor_cost = objective(neighbor, dataset)
         delta = neighbor_cost - current_cost
         # Accept if improving or with some probability to escape local optima.
-        if delta < 0 or random.random() < math.exp(-delta / temperature):
+        # Once the temperature underflows to 0 only non-worsening moves are accepted.
+        if delta < 0 or (random.random() < math.exp(-delta / temperature) if temperature > 0 else delta == 0):
             current_solution = neighbor
             current_cost = neighbor_cost
         if current_cost < best_cost:
@@ -64,7 +387,131 @@ def simulated_annealing(dataset, initial_solution, iterations=1000, initial_temp
         temperature *= cooling_rate
     return best_solution
 
-def tabu_search(dataset, initial_solution, iterations=100, tabu_list_max_size=10):
+def _simulated_annealing_incremental(compiled, assignment, iterations, initial_temp, cooling_rate, rng,
+                                     stats=NULL_STATS, budget=None, resume=None, relocate_rate=0.5):
+    # Same search as the full-evaluation loop, but moves are scored from the students they touch
+    # and applied in place. With probability relocate_rate an iteration proposes moving a student
+    # who is not at their first choice to a college they prefer: a relocate into a free seat, or an
+    # ejection chain / swap with a student of that college if it is full. Other iterations propose
+    # random swaps. Returns the BestTracker holding the best assignment and its cost.
+    with stats.phase("setup"):
+        if resume:
+            assignment, best, state, start = _resume(compiled, resume, "sa", rng)
+            moves = MoveIndex(compiled, assignment, resume)
+            temperature = state["temperature"]
+            last_improvement = state["last_improvement"]
+        else:
+            best = BestTracker(assignment, assignment_cost(compiled, assignment))
+            moves = MoveIndex(compiled, assignment)
+            temperature = initial_temp
+            start = last_improvement = 0
+        movable = np.flatnonzero(assignment >= 0)
+        current_cost = assignment_cost(compiled, assignment)
+    rank = compiled.student_rank
+    pref_ptr = compiled.student_prefs.indptr
+    pref_items = compiled.student_prefs.items
+    lengths = compiled.student_prefs.lengths
+    end = iterations if iterations is not None else sys.maxsize
+    if len(movable) < 2 and not (relocate_rate and len(moves.unhappy)):
+        end = start  # Nothing to swap or relocate: the start is the result.
+    accepted = improved = 0
+    next_sample = stats.first_sample()
+    next_poll = budget.start(start) if budget else -1
+
+    def save():
+        state = {"temperature": temperature, "last_improvement": last_improvement}
+        save_checkpoint(budget.checkpoint_file, "sa", i, assignment, best, state, rng, **moves.checkpoint_arrays())
+
+    i = start
+    with stats.phase("search"):
+        for i in range(start, end):
+            if i == next_sample:
+                next_sample = stats.sample(i, current_cost, best.cost, temperature)
+            if i == next_poll:
+                stop, next_poll = budget.poll(i, i, last_improvement, save)
+                if stop:
+                    break
+            if relocate_rate and len(moves.unhappy) and rng.random() < relocate_rate:
+                s1 = moves.unhappy.pick(rng.random())
+                c1 = assignment[s1]
+                r1 = int(rank[s1, c1])
+                # A college listed above c1 (any listed one if c1 is off s1's list).
+                target = int(pref_items[pref_ptr[s1] + int(rng.random() * min(r1, lengths[s1]))])
+                s2 = destination = -1
+                if moves.has_free_seat(target):
+                    delta = int(rank[s1, target]) - r1
+                else:
+                    s2 = moves.member(target, rng.random())
+                    if s2 < 0:
+                        temperature *= cooling_rate
+                        continue  # A zero-capacity college: nothing to move into.
+                    destination = moves.open_colleges.pick(rng.random()) if len(moves.open_colleges) else c1
+                    if destination == c1:
+                        delta = swap_delta(compiled, assignment, s1, s2)
+                    else:
+                        delta = int(rank[s1, target]) - r1 + int(rank[s2, destination]) - int(rank[s2, target])
+            elif len(movable) < 2:
+                temperature *= cooling_rate
+                continue  # No pair to swap.
+            else:
+                a, b = rng.sample(range(len(movable)), 2)
+                s1, s2 = movable[a], movable[b]
+                target = destination = None
+                delta = swap_delta(compiled, assignment, s1, s2)
+            # Once the temperature underflows to 0 only non-worsening moves are accepted.
+            if delta < 0 or (rng.random() < math.exp(-delta / temperature) if temperature > 0 else delta == 0):
+                if target is None or (s2 >= 0 and destination == assignment[s1]):
+                    moves.swap(s1, s2, best)
+                elif s2 < 0:
+                    moves.relocate(s1, target, best)
+                else:
+                    moves.eject(s1, target, s2, destination, best)
+                current_cost += delta
+                accepted += 1
+                if best.offer(assignment, current_cost):
+                    improved += 1
+                    last_improvement = i
+                    stats.improved(i, temperature)
+            temperature *= cooling_rate
+        else:
+            i = max(start, end)
+    if budget:
+        budget.finish(save)
+    stats.count(proposed=i - start, accepted=accepted, rejected=i - start - accepted, improved=improved)
+    return best
+
+def tabu_search(dataset, initial_solution, iterations=100, tabu_list_max_size=10, incremental=True, rng=None,
+                stats=None, budget=None, resume_from=None, candidates=64):
+    """
+    Tabu search over two-student swaps.
+
+    In incremental mode every iteration scores `candidates` sampled moves in
+    one vectorized pass and applies the best admissible one, even if it
+    worsens the cost. Half of the candidates start from a student who is not
+    at their first choice, the rest from any student. Each proposes a
+    college that student prefers to its current one: a relocate if it has a
+    free seat, otherwise the better of a swap with a random member of it and
+    an ejection chain sending that member to a random college with a free
+    seat. Students already at their first choice swap with any student. A
+    move is tabu while a student it moves moved within the last
+    tabu_list_max_size applied moves (the per-student tenure), unless it
+    would produce a new best (aspiration). incremental=False keeps the
+    original single-swap hill climber as a reference.
+    rng, stats, budget and resume_from work as in simulated_annealing().
+    """
+    dataset = ensure_compiled(dataset)
+    if incremental:
+        stats = stats or NULL_STATS
+        rng = rng or random
+        with stats.phase("setup"):
+            resume = load_checkpoint(resume_from) if resume_from else None
+            assignment = None if resume else dataset.encode_solution(initial_solution)
+        best = _tabu_search_incremental(dataset, assignment, iterations, tabu_list_max_size, rng, stats,
+                                        budget, resume, candidates)
+        with stats.phase("decode"):
+            return dataset.decode_solution(best.assignment)
+    if stats is not None or budget is not None or resume_from is not None:
+        raise ValueError("stats, budget and resume_from require incremental=True")
     current_solution = initial_solution
     current_cost = objective(current_solution, dataset)
     best_solution = current_solution
@@ -87,6 +534,295 @@ def tabu_search(dataset, initial_solution, iterations=100, tabu_list_max_size=10
             tabu_list.pop(0)
     return best_solution
 
+class TabuMemory:
+    """
+    Recently moved students: until[s] is the number of applied moves after
+    which student s stops being tabu, so a student stays tabu for the next
+    tenure applied moves whether its move touched one student (a relocate)
+    or two. The array serves as the O(1) membership table and can be
+    gathered for a whole batch of candidate moves at once.
+    """
+
+    def __init__(self, num_students, tenure, until=None, applied=0):
+        self.tenure = max(tenure, 0)
+        self.until = np.zeros(num_students, dtype=np.int64) if until is None else until
+        self.applied = applied
+
+    def is_tabu(self, students):
+        return self.until[students] > self.applied
+
+    def add(self, *students):
+        # Records one applied move of the given students.
+        self.applied += 1
+        for student in students:
+            self.until[student] = self.applied + self.tenure
+
+def _tabu_search_incremental(compiled, assignment, iterations, tabu_list_max_size, rng, stats=NULL_STATS,
+                             budget=None, resume=None, candidates=64):
+    with stats.phase("setup"):
+        if resume:
+            assignment, best, state, start = _resume(compiled, resume, "tabu", rng)
+            tabu = TabuMemory(compiled.num_students, tabu_list_max_size, resume["tabu_until"], state["tabu_applied"])
+            moves = MoveIndex(compiled, assignment, resume)
+            np_rng = np.random.default_rng()
+            np_rng.bit_generator.state = state["np_rng_state"]
+            last_improvement = state["last_improvement"]
+            evaluations = state["evaluations"]
+        else:
+            best = BestTracker(assignment, assignment_cost(compiled, assignment))
+            tabu = TabuMemory(compiled.num_students, tabu_list_max_size)
+            moves = MoveIndex(compiled, assignment)
+            # Candidate batches are drawn with NumPy, seeded from rng so runs stay reproducible.
+            np_rng = np.random.default_rng(rng.getrandbits(64))
+            start = last_improvement = evaluations = 0
+        movable = np.flatnonzero(assignment >= 0)
+        current_cost = assignment_cost(compiled, assignment)
+    rank = compiled.student_rank
+    pref_ptr = compiled.student_prefs.indptr
+    pref_items = compiled.student_prefs.items
+    lengths = compiled.student_prefs.lengths
+    end = iterations if iterations is not None else sys.maxsize
+    if len(movable) < 2 and not len(moves.unhappy):
+        end = start  # Nothing to swap or relocate: the start is the result.
+    accepted = blocked = aspirated = improved = relocated = ejected = 0
+    next_sample = stats.first_sample()
+    next_poll = budget.start(start) if budget else -1
+
+    def save():
+        state = {"last_improvement": last_improvement, "evaluations": evaluations,
+                 "tabu_applied": tabu.applied, "np_rng_state": np_rng.bit_generator.state}
+        save_checkpoint(budget.checkpoint_file, "tabu", i, assignment, best, state, rng, tabu_until=tabu.until,
+                        **moves.checkpoint_arrays())
+
+    i = start
+    with stats.phase("search"):
+        for i in range(start, end):
+            if i == next_sample:
+                next_sample = stats.sample(i, current_cost, best.cost)
+            if i == next_poll:
+                stop, next_poll = budget.poll(i, evaluations, last_improvement, save)
+                if stop:
+                    break
+            # Sample a batch of candidate moves and score them in one pass.
+            u = np_rng.random((4, candidates))
+            s1 = movable[(u[2] * len(movable)).astype(np.int64)]
+            if len(moves.unhappy):
+                s1[:candidates // 2] = moves.unhappy.sample(u[2, :candidates // 2])
+            c1 = assignment[s1]
+            r1 = rank[s1, c1].astype(np.int64)
+            better = np.minimum(r1, lengths[s1])  # Listed colleges s1 prefers to c1.
+            position = np.minimum(pref_ptr[s1] + (u[0] * better).astype(np.int64), len(pref_items) - 1)
+            targets = np.where(better > 0, pref_items[position], c1)  # A college s1 prefers; its own if none.
+            relocate = (better > 0) & (moves.occupancy[targets] < moves.capacity[targets])
+            s2 = moves.members(targets, u[1])
+            s2 = np.where((better > 0) & (s2 >= 0), s2, movable[(u[1] * len(movable)).astype(np.int64)])
+            c2 = assignment[s2]
+            delta = np.where(relocate, rank[s1, targets] - r1, rank[s1, c2] + rank[s2, c1] - r1 - rank[s2, c2])
+            # Ejection chain: s2 leaves the full target for a random open college instead of taking c1.
+            if len(moves.open_colleges):
+                destinations = moves.open_colleges.sample(u[3])
+                chain = rank[s1, c2] - r1 + rank[s2, destinations] - rank[s2, c2]
+                eject = ~relocate & (better > 0) & (destinations != c1) & (destinations != c2) & (chain < delta)
+                delta = np.where(eject, chain, delta)
+            else:
+                eject = np.zeros(candidates, dtype=bool)
+            evaluations += candidates
+            useful = relocate | (c1 != c2)  # Also rules out s1 == s2.
+            tabu_moves = useful & (tabu.is_tabu(s1) | (~relocate & tabu.is_tabu(s2)))
+            aspiration = tabu_moves & (current_cost + delta < best.cost)
+            admissible = useful & (~tabu_moves | aspiration)
+            blocked += int(np.count_nonzero(tabu_moves & ~aspiration))
+            if not admissible.any():
+                continue
+            k = int(np.argmin(np.where(admissible, delta, np.iinfo(np.int64).max)))
+            aspirated += int(aspiration[k])
+            a, b = int(s1[k]), int(s2[k])
+            if relocate[k]:
+                moves.relocate(a, int(targets[k]), best)
+                relocated += 1
+                tabu.add(a)
+            else:
+                if eject[k]:
+                    moves.eject(a, int(c2[k]), b, int(destinations[k]), best)
+                    ejected += 1
+                else:
+                    moves.swap(a, b, best)
+                tabu.add(a, b)
+            current_cost += int(delta[k])
+            accepted += 1
+            if best.offer(assignment, current_cost):
+                improved += 1
+                last_improvement = i
+                stats.improved(i)
+        else:
+            i = max(start, end)
+    if budget:
+        budget.finish(save)
+    proposed = (i - start) * candidates
+    stats.count(proposed=proposed, accepted=accepted, rejected=proposed - accepted - blocked,
+                tabu_blocked=blocked, aspirated=aspirated, improved=improved, relocated=relocated, ejected=ejected)
+    return best
+
+def deferred_acceptance(dataset, proposing="students"):
+    """
+    Capacitated deferred acceptance (Gale-Shapley) on student_preferences,
+    college_preferences and capacities. Returns a stable {student: college}
+    matching; proposing="students" gives the student-optimal one and
+    proposing="colleges" the college-optimal one. Runs in O(total
+    preference length), up to the log factor of the per-college heaps.
+    """
+    compiled = ensure_compiled(dataset)
+    if proposing == "students":
+        assignment = _student_proposing_da(compiled)
+    elif proposing == "colleges":
+        assignment = _college_proposing_da(compiled)
+    else:
+        raise ValueError(f"proposing must be 'students' or 'colleges', got {proposing!r}")
+    return compiled.decode_solution(assignment)
+
+def _student_proposing_da(compiled):
+    num_students = compiled.num_students
+    num_colleges = compiled.num_colleges
+    # Proposals walk the flat student lists: student i's list is pref_items[pref_ptr[i]:pref_ptr[i + 1]],
+    # and pref_rank holds each entry's rank on the college's side, looked up in one pass.
+    student_prefs = compiled.student_prefs
+    pref_items = student_prefs.items.tolist()
+    pref_ptr = student_prefs.indptr.tolist()
+    pref_rank = compiled.college_rank[student_prefs.items, student_prefs.owners()].tolist()
+    capacities = compiled.capacities.tolist()
+    next_choice = pref_ptr[:-1]
+    # Per-college max-heap of tentative admits keyed by college rank, so the worst admit is on top.
+    admitted = [[] for _ in range(num_colleges)]
+    free = list(range(num_students - 1, -1, -1))
+
+    while free:
+        i = free.pop()
+        while next_choice[i] < pref_ptr[i + 1]:  # Past the end of its list a student stays unassigned.
+            j = pref_items[next_choice[i]]
+            r = pref_rank[next_choice[i]]
+            next_choice[i] += 1
+            if r >= num_students or capacities[j] == 0:
+                continue
+            heap = admitted[j]
+            if len(heap) < capacities[j]:
+                heapq.heappush(heap, (-r, i))
+                break
+            if r < -heap[0][0]:
+                _, rejected = heapq.heapreplace(heap, (-r, i))
+                free.append(rejected)
+                break
+
+    assignment = np.full(num_students, -1, dtype=np.int32)
+    for j, heap in enumerate(admitted):
+        for _, i in heap:
+            assignment[i] = j
+    return assignment
+
+def _college_proposing_da(compiled):
+    num_students = compiled.num_students
+    num_colleges = compiled.num_colleges
+    college_prefs = compiled.college_prefs
+    student_rank = compiled.student_rank
+    open_seats = compiled.capacities.tolist()
+    next_choice = [0] * num_colleges
+    held = [-1] * num_students  # College each student currently holds, and its rank on their list.
+    held_rank = [num_colleges] * num_students
+    active = [j for j in range(num_colleges - 1, -1, -1) if open_seats[j] > 0]
+    # Colleges walk long lists, so each row is scanned as plain lists of students and their ranks of j.
+    rows = [None] * num_colleges
+    row_ranks = [None] * num_colleges
+
+    while active:
+        j = active.pop()
+        if rows[j] is None:
+            rows[j] = college_prefs[j].tolist()
+            row_ranks[j] = student_rank[college_prefs[j], j].tolist()
+        prefs, ranks = rows[j], row_ranks[j]
+        while open_seats[j] > 0 and next_choice[j] < len(prefs):
+            i = prefs[next_choice[j]]
+            r = ranks[next_choice[j]]
+            next_choice[j] += 1
+            if r >= num_colleges:
+                continue
+            current = held[i]
+            if current < 0:
+                held[i] = j
+                held_rank[i] = r
+                open_seats[j] -= 1
+            elif r < held_rank[i]:
+                held[i] = j
+                held_rank[i] = r
+                open_seats[j] -= 1
+                open_seats[current] += 1
+                active.append(current)
+
+    return np.array(held, dtype=np.int32)
+
+MULTI_START_DEFAULTS = {
+    "sa": {"iterations": 1000, "initial_temp": 100, "cooling_rate": 0.95, "relocate_rate": 0.5},
+    "tabu": {"iterations": 100, "tabu_list_max_size": 10, "candidates": 64},
+}
+
+# Per-process state for multi_start(): the dataset is sent once per worker by the pool initializer.
+_worker_state = {}
+
+def _init_multi_start_worker(compiled, assignment):
+    _worker_state["compiled"] = compiled
+    _worker_state["assignment"] = assignment
+
+def _multi_start_run(task):
+    method, seed, params = task
+    compiled = _worker_state["compiled"]
+    assignment = _worker_state["assignment"].copy()
+    rng = random.Random(seed)
+    if method == "sa":
+        best = _simulated_annealing_incremental(compiled, assignment, rng=rng, **params)
+    else:
+        best = _tabu_search_incremental(compiled, assignment, rng=rng, **params)
+    return best.cost, best.assignment
+
+def multi_start(dataset, initial_solution, method="sa", runs=8, seed=42, processes=None, **params):
+    """
+    Run `runs` independent SA ("sa") or tabu ("tabu") trajectories from
+    initial_solution across a process pool and keep the best one.
+
+    Each run gets its own random.Random seeded from `seed`, so results are
+    reproducible regardless of scheduling. Remaining keyword arguments
+    override MULTI_START_DEFAULTS for the method. processes=1 runs inline.
+    A budget with a checkpoint_file gives run k its own file, the name with
+    "-run<k>" before the extension, which simulated_annealing() /
+    tabu_search() can resume_from. Returns (best_solution, per-run costs in
+    run order).
+    """
+    if method not in MULTI_START_DEFAULTS:
+        raise ValueError(f"method must be one of {sorted(MULTI_START_DEFAULTS)}, got {method!r}")
+    compiled = ensure_compiled(dataset)
+    assignment = compiled.encode_solution(initial_solution)
+    master = random.Random(seed)
+    settings = {**MULTI_START_DEFAULTS[method], **params}
+    tasks = [(method, master.getrandbits(63), settings) for _ in range(runs)]
+    budget = settings.get("budget")
+    if budget is not None and budget.checkpoint_file is not None:
+        # Concurrent runs must not share (and race on) one checkpoint file.
+        root, ext = os.path.splitext(budget.checkpoint_file)
+        for k, (method, run_seed, run_settings) in enumerate(tasks):
+            run_budget = copy.copy(budget)
+            run_budget.checkpoint_file = f"{root}-run{k}{ext}"
+            tasks[k] = (method, run_seed, {**run_settings, "budget": run_budget})
+
+    processes = processes or min(runs, os.cpu_count() or 1)
+    if processes == 1:
+        _init_multi_start_worker(compiled, assignment)
+        results = [_multi_start_run(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes, initializer=_init_multi_start_worker,
+                                  initargs=(compiled, assignment)) as pool:
+            results = pool.map(_multi_start_run, tasks, chunksize=1)
+
+    costs = [cost for cost, _ in results]
+    best_run = min(range(runs), key=costs.__getitem__)
+    return compiled.decode_solution(results[best_run][1]), costs
+
 def save_solution(solution, output_file):
     with open(output_file, "w") as f:
         json.dump(solution, f, indent=4)
@@ -94,7 +830,7 @@ def save_solution(solution, output_file):
 
 if __name__ == "__main__":
     random.seed(42)  # For reproducibility
-    dataset = load_dataset("college_student_dataset.json")
+    dataset = ensure_compiled(load_dataset("college_student_dataset.json"))
     
     # Greedy Matching
     greedy_sol = greedy_matching(dataset)
@@ -107,3 +843,9 @@ if __name__ == "__main__":
     # Tabu Search Matching (starting from the Greedy solution)
     ts_sol = tabu_search(dataset, greedy_sol, iterations=100, tabu_list_max_size=10)
     save_solution(ts_sol, "result_ts.json")
+
+    # Deferred Acceptance (student- and college-proposing stable matchings)
+    da_sol = deferred_acceptance(dataset, proposing="students")
+    save_solution(da_sol, "result_da.json")
+    da_college_sol = deferred_acceptance(dataset, proposing="colleges")
+    save_solution(da_college_sol, "result_da_colleges.json")
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from admission_csr import GRAPH_KINDS, AdmissionCSR
+from analyse import find_admission_blocking_pairs
+from fq_stable_matching import GRAPH_BUILDERS
+
+
+def random_admission_data(rng):
+    # Small integer scores, so programs see plenty of ties.
+    students = [f"S{i}" for i in range(rng.randint(1, 30))]
+    colleges = [f"C{j}" for j in range(rng.randint(1, 5))]
+    return {
+        "students": students,
+        "colleges": colleges,
+        "capacities": {c: {"regular_quota": rng.randint(0, 4), "reserved_quota": rng.choice((0, 0, 1, 2)),
+                           "eligibility_score": rng.randint(0, 3)} for c in colleges},
+        "bea_eligible": [s for s in students if rng.random() < 0.4],
+        "student_preferences": {s: rng.sample(colleges, rng.randint(0, len(colleges))) for s in students},
+        "student_scores": {s: {c: rng.randint(0, 5) for c in colleges} for s in students},
+    }
+
+
+def program_lists(data, kind):
+    # Each student's acceptable programs in its preference order, and each program's (college, quota).
+    bea = set(data["bea_eligible"])
+    lists, programs = {}, {}
+    for s in data["students"]:
+        lists[s] = []
+        for c in data["student_preferences"][s]:
+            cap = data["capacities"][c]
+            if data["student_scores"][s].get(c, 0) < cap["eligibility_score"]:
+                continue
+            if kind == "regular":
+                choices = [(c, cap["regular_quota"])]
+            elif kind == "bea":
+                choices = [(c, cap["reserved_quota"])] if cap["reserved_quota"] > 0 and s in bea else []
+            else:
+                choices = [(f"{c}_reg", cap["regular_quota"])]
+                if cap["reserved_quota"] > 0 and s in bea:
+                    choices.append((f"{c}_res", cap["reserved_quota"]))
+            for p, quota in choices:
+                lists[s].append(p)
+                programs[p] = (c, quota)
+    return lists, programs
+
+
+def brute_force_blocking_pairs(solution, data, kind):
+    lists, programs = program_lists(data, kind)
+    score = lambda s, p: data["student_scores"][s].get(programs[p][0], 0)
+    admitted = {p: [s for s, q in solution.items() if q == p] for p in programs}
+    assert all(solution[s] in lists[s] for s in solution)
+    assert all(len(admitted[p]) <= programs[p][1] for p in programs)
+    blocking = []
+    for s in data["students"]:
+        better = lists[s][:lists[s].index(solution[s])] if s in solution else lists[s]
+        for p in better:
+            if len(admitted[p]) < programs[p][1] or any(score(t, p) < score(s, p) for t in admitted[p]):
+                blocking.append((s, p))
+    return blocking
+
+
+@pytest.mark.parametrize("kind", GRAPH_KINDS)
+def test_csr_graph_matches_the_networkx_builders(kind):
+    rng = random.Random(GRAPH_KINDS.index(kind))
+    builder = GRAPH_BUILDERS[kind][0]
+    for _ in range(200):
+        data = random_admission_data(rng)
+        G, programs = builder(data)
+        csr = AdmissionCSR(data, kind)
+        H = csr.to_networkx()
+        assert csr.programs == programs
+        assert set(H.nodes()) == set(G.nodes())
+        assert set(H.edges()) == set(G.edges())
+        assert csr.num_edges <= 3 * csr.num_nodes
+
+
+@pytest.mark.parametrize("kind", GRAPH_KINDS)
+def test_stable_matching_has_no_blocking_pairs(kind):
+    rng = random.Random(10 + GRAPH_KINDS.index(kind))
+    for _ in range(300):
+        data = random_admission_data(rng)
+        solution = AdmissionCSR(data, kind).solution()
+        assert brute_force_blocking_pairs(solution, data, kind) == []
+        if kind == "unified":
+            report = find_admission_blocking_pairs(solution, data)
+            assert report["stable"] and not report["over_capacity"], report
@@ -0,0 +1,81 @@
+import copy
+import random
+from fractions import Fraction
+
+import pytest
+
+from analyse import find_blocking_pairs
+from rematch import IncrementalMatching
+from solve import deferred_acceptance
+
+DELTA_KINDS = ("capacity", "withdraw", "preferences", "add_student")
+
+
+def random_market(rng):
+    students = [f"S{i}" for i in range(rng.randint(2, 14))]
+    colleges = [f"C{j}" for j in range(rng.randint(1, 4))]
+    return {
+        "students": students,
+        "colleges": colleges,
+        "capacities": {c: rng.randint(0, 4) for c in colleges},
+        "student_preferences": {s: rng.sample(colleges, rng.randint(0, len(colleges))) for s in students},
+        "college_preferences": {c: rng.sample(students, rng.randint(0, len(students))) for c in colleges},
+    }
+
+
+def random_delta(rng, kind, original, dataset):
+    colleges = dataset["colleges"]
+    if kind == "capacity":
+        return {"kind": kind, "college": rng.choice(colleges), "capacity": rng.randint(0, 5)}
+    if kind == "withdraw":
+        return {"kind": kind, "student": rng.choice(original["students"])}
+    if kind == "preferences":
+        return {"kind": kind, "student": rng.choice(original["students"]),
+                "preferences": rng.sample(colleges, rng.randint(0, len(colleges)))}
+    return {"kind": kind, "student": f"N{len(dataset['students']) - len(original['students'])}",
+            "preferences": rng.sample(colleges, rng.randint(0, len(colleges))),
+            "college_positions": {c: rng.randint(0, len(original["college_preferences"][c]))
+                                  for c in rng.sample(colleges, rng.randint(0, len(colleges)))}}
+
+
+def apply_to_dataset(delta, original, dataset, added):
+    # The market after the delta, written out in full; added maps (college, student) to its added rank.
+    dataset = copy.deepcopy(dataset)
+    kind = delta["kind"]
+    if kind == "capacity":
+        dataset["capacities"][delta["college"]] = delta["capacity"]
+    elif kind == "withdraw":
+        dataset["student_preferences"][delta["student"]] = []
+    elif kind == "preferences":
+        dataset["student_preferences"][delta["student"]] = delta["preferences"]
+    else:
+        s = delta["student"]
+        offset = Fraction(1, 2 + len(dataset["students"]) - len(original["students"]))
+        dataset["students"].append(s)
+        dataset["student_preferences"][s] = delta["preferences"]
+        for c, p in delta["college_positions"].items():
+            added[(c, s)] = p - offset
+        for c in dataset["colleges"]:
+            listed = dataset["college_preferences"][c] + [s] * ((c, s) in added)
+            original_rank = {t: r for r, t in enumerate(original["college_preferences"][c])}
+            dataset["college_preferences"][c] = sorted(listed, key=lambda t: added.get((c, t), original_rank.get(t)))
+    return dataset
+
+
+@pytest.mark.parametrize("kind", DELTA_KINDS)
+def test_random_deltas_keep_the_matching_stable(kind):
+    rng = random.Random(DELTA_KINDS.index(kind))
+    for _ in range(300):
+        original = dataset = random_market(rng)
+        added = {}
+        matching = IncrementalMatching(dataset, deferred_acceptance(dataset))
+        # The delta under test, after a few random ones so it also starts from repaired states.
+        for step_kind in [rng.choice(DELTA_KINDS) for _ in range(rng.randint(0, 3))] + [kind]:
+            delta = random_delta(rng, step_kind, original, dataset)
+            dataset = apply_to_dataset(delta, original, dataset, added)
+            before = matching.solution()
+            changed = matching.apply(delta)
+            after = matching.solution()
+            report = find_blocking_pairs(after, dataset)
+            assert report["stable"] and not report["over_capacity"], (delta, report)
+            assert changed == {s for s in set(before) | set(after) if before.get(s) != after.get(s)}
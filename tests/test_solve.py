@@ -0,0 +1,19 @@
+import random
+
+import pytest
+
+from solve import simulated_annealing, tabu_search
+
+
+@pytest.mark.parametrize("assigned", [0, 1])
+@pytest.mark.parametrize("search", [simulated_annealing, tabu_search])
+def test_search_with_fewer_than_two_assigned_students(search, assigned):
+    dataset = {
+        "students": ["S0", "S1", "S2"],
+        "colleges": ["C0", "C1"],
+        "capacities": {"C0": 1, "C1": 0},
+        "student_preferences": {"S0": ["C1", "C0"], "S1": [], "S2": ["C1"]},
+        "college_preferences": {"C0": ["S0"], "C1": ["S0", "S2"]},
+    }
+    start = {"S0": "C0"} if assigned else {}
+    assert search(dataset, start, iterations=50, rng=random.Random(0)) == start